@@ -0,0 +1,164 @@
+"""
+Columnar attendance analytics for the Student Attendance Tracker
+
+AttendanceMatrix holds one status code per student per day in a single
+contiguous int8 buffer (row-major: students x dates) instead of a list of
+record dicts. Students are sorted by batch and course so every batch/course
+filter is a handful of contiguous row ranges, and all counts are reductions
+over buffer slices: NumPy when it is installed, bytes.count otherwise.
+"""
+from datetime import date, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NOT_MARKED = 0
+PRESENT = 1
+ABSENT = 2
+
+STATUS_CODES = {'present': PRESENT, 'absent': ABSENT}
+
+# attendance_status_strings() encodes a student's window as '0'/'1'/'2' characters
+_DIGIT_CODES = bytes.maketrans(b'012', bytes([NOT_MARKED, PRESENT, ABSENT]))
+
+
+def date_range(start, end):
+    current = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+    days = []
+    while current <= last:
+        days.append(current.isoformat())
+        current += timedelta(days=1)
+    return days
+
+
+def percentage(present, total):
+    return round((present / total * 100) if total > 0 else 0, 1)
+
+
+class AttendanceMatrix:
+    """Students x dates matrix of attendance status codes (0 unmarked, 1 present, 2 absent)"""
+
+    def __init__(self, students, dates, use_numpy=None):
+        self.students = sorted(students, key=lambda s: (s.get('batch') or '', s.get('course') or '',
+                                                         s.get('roll_number') or ''))
+        self.dates = list(dates)
+        self.student_index = {student['id']: i for i, student in enumerate(self.students)}
+        self.date_index = {day: j for j, day in enumerate(self.dates)}
+        self.data = bytearray(len(self.students) * len(self.dates))
+
+        # Contiguous row range for every (batch, course) group
+        self.groups = {}
+        for i, student in enumerate(self.students):
+            key = (student.get('batch'), student.get('course'))
+            lo, _ = self.groups.get(key, (i, i))
+            self.groups[key] = (lo, i + 1)
+
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        self.matrix = None
+        if self.use_numpy:
+            # Zero-copy view; writes through self.data are visible to it
+            self.matrix = np.frombuffer(self.data, dtype=np.int8).reshape(len(self.students), len(self.dates))
+
+    @classmethod
+    def from_records(cls, students, records, start, end, use_numpy=None):
+        matrix = cls(students, date_range(start, end), use_numpy=use_numpy)
+        # Local lookups; this loop dominates build time
+        data, width = matrix.data, len(matrix.dates)
+        rows, columns = matrix.student_index, matrix.date_index
+        for record in records:
+            row = rows.get(record['student_id'])
+            column = columns.get(record['attendance_date'])
+            code = STATUS_CODES.get(record['status'])
+            if row is not None and column is not None and code is not None:
+                data[row * width + column] = code
+        return matrix
+
+    @classmethod
+    def from_status_strings(cls, students, dates, rows, use_numpy=None):
+        """Build from attendance_status_strings() rows: one status character per date"""
+        matrix = cls(students, dates, use_numpy=use_numpy)
+        width = len(matrix.dates)
+        for row in rows:
+            i = matrix.student_index.get(row['student_id'])
+            statuses = row.get('statuses') or ''
+            if i is not None and len(statuses) == width:
+                matrix.data[i * width:(i + 1) * width] = statuses.encode('ascii').translate(_DIGIT_CODES)
+        return matrix
+
+    # ----- reductions -----
+
+    def _ranges(self, batch=None, course=None):
+        return sorted(
+            bounds for (group_batch, group_course), bounds in self.groups.items()
+            if (not batch or group_batch == batch) and (not course or group_course == course)
+        )
+
+    def _row_counts(self, ranges, code, first=0, last=None):
+        width = len(self.dates)
+        last = width if last is None else last
+        if self.use_numpy:
+            return {i: count for lo, hi in ranges
+                    for i, count in zip(range(lo, hi), (self.matrix[lo:hi, first:last] == code).sum(axis=1).tolist())}
+        data = self.data
+        return {i: data[i * width + first:i * width + last].count(code)
+                for lo, hi in ranges for i in range(lo, hi)}
+
+    def student_percentages(self, batch=None, course=None, start=None, end=None):
+        """Attendance per student over [start, end] (defaults to the whole matrix)"""
+        first = self.date_index[start] if start else 0
+        last = self.date_index[end] + 1 if end else len(self.dates)
+        ranges = self._ranges(batch, course)
+        present = self._row_counts(ranges, PRESENT, first, last)
+        absent = self._row_counts(ranges, ABSENT, first, last)
+        result = []
+        for i in sorted(present):
+            student = self.students[i]
+            p, a = present[i], absent[i]
+            result.append({
+                'student_id': student['id'],
+                'roll_number': student.get('roll_number'),
+                'first_name': student.get('first_name'),
+                'last_name': student.get('last_name'),
+                'batch': student.get('batch'),
+                'course': student.get('course'),
+                'present': p,
+                'absent': a,
+                'total': p + a,
+                'percentage': percentage(p, p + a)
+            })
+        return result
+
+    def absence_streaks(self, batch=None, course=None):
+        """(current, longest) run of consecutive absences per student row, skipping unmarked days"""
+        width = len(self.dates)
+        data = self.data
+        streaks = {}
+        for lo, hi in self._ranges(batch, course):
+            for i in range(lo, hi):
+                marked = bytes(data[i * width:(i + 1) * width]).replace(b'\x00', b'')
+                current = len(marked) - len(marked.rstrip(b'\x02'))
+                longest = max(len(run) for run in marked.split(b'\x01'))
+                streaks[i] = (current, longest)
+        return streaks
+
+    def at_risk(self, threshold=75, batch=None, course=None, limit=None):
+        """Students with at least one marked day whose attendance is below threshold.
+
+        Sorted worst first (lowest percentage, then longest current absence
+        streak); returns (total_at_risk, first `limit` rows).
+        """
+        streaks = self.absence_streaks(batch, course)
+        by_id = self.student_index
+        result = []
+        for row in self.student_percentages(batch, course):
+            if row['total'] == 0 or row['percentage'] >= threshold:
+                continue
+            current, longest = streaks[by_id[row['student_id']]]
+            row['current_absence_streak'] = current
+            row['longest_absence_streak'] = longest
+            result.append(row)
+        result.sort(key=lambda r: (r['percentage'], -r['current_absence_streak'], r['roll_number'] or ''))
+        return len(result), result[:limit] if limit else result
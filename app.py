@@ -2,30 +2,91 @@
 Student Attendance Tracker - Flask Backend
 Designed for PythonAnywhere Free Tier with Supabase
 """
-from flask import Flask, request, jsonify, session, send_from_directory
+# Timed from the very top so app_startup_seconds{phase="import"} covers the Flask import too
+import time
+APP_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, session, send_from_directory, Response, stream_with_context, make_response
 from flask_cors import CORS
-from flask_session import Session
 from werkzeug.security import check_password_hash, generate_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
+import re
+import csv
+import io
+import json
+import base64
+import zlib
+from calendar import monthrange
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from supabase_config import get_supabase_client
+from supabase_config import LazySupabaseClient
+from cache import LRUCache, ResponseCache, RosterCache
+from session_store import init_session
+from shared_cache import init_cache_store
+from analytics import AttendanceMatrix, date_range
+from student_import import ImportReport, import_students
+import metrics
+import health
 
 app = Flask(__name__, static_folder='frontend', static_url_path='')
 
 # Configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
-app.config['SESSION_TYPE'] = 'filesystem'
+# Required; init_session() refuses to start with a missing or example key
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+# Session storage: cookie (stateless, default), memory, sqlite or filesystem
+app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'cookie')
+if os.environ.get('SESSION_SQLITE_PATH'):
+    app.config['SESSION_SQLITE_PATH'] = os.environ['SESSION_SQLITE_PATH']
+# Roster/report cache shared between workers: local (per process, default), sqlite or redis
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'local')
+if os.environ.get('CACHE_SQLITE_PATH'):
+    app.config['CACHE_SQLITE_PATH'] = os.environ['CACHE_SQLITE_PATH']
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL')
 app.config['SESSION_PERMANENT'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
 
-Session(app)
+# Server-Timing on every response; otherwise only when the request sends X-Server-Timing: 1
+app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+# Bearer token for Prometheus scrapes of /api/metrics; without it a logged-in session is required
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+# Open upstream connections and fill the roster cache in the background at start-up
+app.config['WARMUP'] = os.environ.get('WARMUP', '').lower() in ('1', 'true', 'yes')
+# Set by gunicorn.conf.py: warm up in each forked worker, not in the preloading master
+app.config['WARMUP_IN_WORKERS'] = os.environ.get('WARMUP_IN_WORKERS') == '1'
+
+init_session(app)
 CORS(app, supports_credentials=True)
 
-# Initialize Supabase client
-supabase = get_supabase_client()
+# Supabase client, created on first use (see /api/health for connectivity)
+supabase = LazySupabaseClient()
+metrics.init_metrics(app, supabase)
+
+# Second cache tier shared by all workers (None with CACHE_BACKEND=local)
+cache_store = init_cache_store(app)
+
+# Shared roster cache (students table changes rarely)
+roster = RosterCache(supabase, store=cache_store)
+
+# Rendered report responses, invalidated by attendance writes to the dates they cover
+response_cache = ResponseCache(store=cache_store)
+
+# Browser cache lifetime for reports whose period has ended
+CLOSED_PERIOD_MAX_AGE = int(os.environ.get('CLOSED_PERIOD_MAX_AGE', 24 * 60 * 60))
+
+# Recently applied offline-sync batches, so duplicate replays skip the database
+sync_results = LRUCache(maxsize=2048, ttl=24 * 60 * 60)
+
+# Seconds re-read behind a delta-sync cursor to catch late-committing writes
+ATTENDANCE_SYNC_OVERLAP = float(os.environ.get('ATTENDANCE_SYNC_OVERLAP', 5))
+
+# Worker threads for fanning out independent upstream queries (e.g. /api/dashboard)
+dashboard_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('DASHBOARD_WORKERS', 4)),
+    thread_name_prefix='dashboard'
+)
 
 # Authentication decorator
 def require_auth(f):
@@ -36,6 +97,77 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Response cache decorator for read-only report routes
+def cached_report(date_range=None, by_batch=False):
+    """Serve a GET route from response_cache with a strong ETag.
+
+    date_range(**view_args) returns the (start, end) dates the response
+    covers; mark_attendance invalidates entries whose range includes a
+    written date. by_batch marks routes that honour ?batch=, so writes to
+    other batches leave them cached. Periods that ended before today get a
+    long Cache-Control.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            covered = None
+            try:
+                covered = date_range(**kwargs) if date_range else (None, None)
+            except ValueError:
+                pass
+            if covered is None:
+                # Bad route arguments: let the view report them itself
+                return f(*args, **kwargs)
+            start, end = covered
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), start, end)
+            closed = end is not None and end < datetime.now().strftime('%Y-%m-%d')
+            
+            cached = response_cache.get(key)
+            if cached is None:
+                snapshot = response_cache.snapshot()
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                cached = response_cache.set(
+                    key, response.get_data(), response.mimetype, start, end,
+                    batch=(request.args.get('batch') or None) if by_batch else None,
+                    closed=closed, snapshot=snapshot
+                )
+            
+            response = Response(cached.body, mimetype=cached.mimetype)
+            response.set_etag(cached.etag)
+            if closed:
+                response.headers['Cache-Control'] = f'private, max-age={CLOSED_PERIOD_MAX_AGE}'
+            else:
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response.make_conditional(request)
+        return decorated_function
+    return decorator
+
+def month_range(year, month):
+    return f"{year}-{month:02d}-01", f"{year}-{month:02d}-{monthrange(year, month)[1]:02d}"
+
+def at_risk_range():
+    end_date = request.args.get('endDate') or datetime.now().strftime('%Y-%m-%d')
+    start_date = request.args.get('startDate')
+    if not start_date:
+        days = int(request.args.get('days', AT_RISK_DEFAULT_DAYS))
+        start_date = (datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    return start_date, end_date
+
+def trends_days():
+    # ?days= for the trend charts; anything unparseable falls back to a week
+    try:
+        days = int(request.args.get('days', 7))
+    except ValueError:
+        days = 7
+    return max(days, 1)
+
+def trends_range():
+    days = trends_days()
+    end_date = datetime.now().date()
+    return (end_date - timedelta(days=days - 1)).isoformat(), end_date.isoformat()
+
 # ============= Routes =============
 
 @app.route('/')
@@ -71,6 +203,7 @@ def login():
             return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
         
         # Create session
+        session.permanent = app.config['SESSION_PERMANENT']
         session['admin_id'] = admin['id']
         session['username'] = admin['username']
         
@@ -193,29 +326,113 @@ def change_password():
 
 # ============= Student Routes =============
 
+# Columns clients may request with ?fields= (batch_rank is internal to the list ordering)
+STUDENT_FIELDS = ('id', 'roll_number', 'first_name', 'last_name', 'email', 'phone',
+                  'batch', 'course', 'status', 'created_at', 'updated_at')
+# KL University first, then batch and roll number; roll_number is unique so this is a total order
+STUDENT_LIST_KEYSET = ('batch_rank', 'batch', 'roll_number')
+STUDENTS_PAGE_SIZE = 50
+STUDENTS_MAX_PAGE_SIZE = 500
+STUDENT_SEARCH_MAX_TERMS = 3
+
+def parse_student_fields(value):
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in STUDENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown student field(s): {', '.join(unknown)}")
+    return fields
+
+def student_search_terms(text):
+    # , ( ) " are PostgREST syntax and * % _ are LIKE wildcards; none occur in names or roll numbers
+    return re.sub(r'[,()"*%_\\]', ' ', text or '').split()[:STUDENT_SEARCH_MAX_TERMS]
+
+def encode_student_cursor(row):
+    raw = json.dumps([row[column] for column in STUDENT_LIST_KEYSET]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_student_cursor(value):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(STUDENT_LIST_KEYSET):
+        raise ValueError('Invalid cursor')
+    return dict(zip(STUDENT_LIST_KEYSET, values))
+
+def search_students(terms, batch=None, course=None, fields=None, limit=STUDENTS_PAGE_SIZE, after=None):
+    """One page of active students matching every search term, in list order.
+
+    Each term matches a roll number prefix or a substring of the first or last
+    name (served by the trigram indexes). Returns the page, the cursor for the
+    next page (None on the last one) and the total match count on the first page.
+    """
+    fields = fields or list(STUDENT_FIELDS)
+    columns = list(dict.fromkeys(fields + list(STUDENT_LIST_KEYSET)))
+    query = supabase.table('students').select(','.join(columns)).eq('status', 'active')
+    if batch:
+        query = query.eq('batch', batch)
+    if course:
+        query = query.eq('course', course)
+    for term in terms:
+        query = query.or_(f'roll_number.ilike.{term}*,first_name.ilike.*{term}*,last_name.ilike.*{term}*')
+    for column in STUDENT_LIST_KEYSET:
+        query = query.order(column)
+    if after:
+        query = query.after(STUDENT_LIST_KEYSET, after)
+    else:
+        query = query.count('exact')
+
+    # One extra row tells us whether there is a next page without a second count
+    response = query.limit(limit + 1).execute()
+    rows = response.data
+    next_cursor = encode_student_cursor(rows[limit - 1]) if len(rows) > limit else None
+    students = [{field: row.get(field) for field in fields} for row in rows[:limit]]
+    return students, next_cursor, None if after else response.total
+
 @app.route('/api/students', methods=['GET'])
 @require_auth
 def get_students():
+    """Active students.
+
+    Without q/limit/cursor the whole (cached) roster is returned, as before.
+    With any of them the list is searched and paged server-side:
+    ?q=<terms>&limit=<n>&cursor=<next_cursor>. ?fields=id,roll_number,...
+    trims every student to the listed columns in both modes.
+    """
     try:
         batch = request.args.get('batch')
         course = request.args.get('course')
         
-        query = supabase.table('students').select('*').eq('status', 'active')
-        
-        if batch:
-            query = query.eq('batch', batch)
-        if course:
-            query = query.eq('course', course)
+        try:
+            fields = parse_student_fields(request.args.get('fields'))
+            paged = any(name in request.args for name in ('q', 'limit', 'cursor'))
+            if paged:
+                limit = min(max(int(request.args.get('limit', STUDENTS_PAGE_SIZE)), 1), STUDENTS_MAX_PAGE_SIZE)
+                cursor = request.args.get('cursor')
+                after = decode_student_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if paged:
+            students, next_cursor, total = search_students(
+                student_search_terms(request.args.get('q')), batch=batch, course=course,
+                fields=fields, limit=limit, after=after
+            )
+            result = {'success': True, 'students': students, 'next_cursor': next_cursor}
+            if total is not None:
+                result['total'] = total
+            return jsonify(result)
         
         # Order by KL University first, then by batch and roll number
-        response = query.order('batch').order('roll_number').execute()
-        
-        # Sort to prioritize KL University
-        students = sorted(response.data, key=lambda x: (
+        students = sorted(roster.get_students(batch=batch, course=course), key=lambda x: (
             0 if x['batch'] == 'KL University' else 1,
             x['batch'],
             x['roll_number']
         ))
+        if fields:
+            students = [{field: student.get(field) for field in fields} for student in students]
         
         return jsonify({'success': True, 'students': students})
     
@@ -225,10 +442,10 @@ def get_students():
 
 @app.route('/api/students/stats', methods=['GET'])
 @require_auth
+@cached_report()
 def get_student_stats():
     try:
-        response = supabase.table('students').select('batch, course').eq('status', 'active').execute()
-        students = response.data
+        students = roster.get_students()
         
         # Calculate statistics
         batches = list(set(s['batch'] for s in students))
@@ -264,8 +481,112 @@ def get_student_stats():
         print(f"Get stats error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/students/cache/invalidate', methods=['POST'])
+@require_auth
+def invalidate_student_cache():
+    # Call after editing the students table outside the app (e.g. SQL editor)
+    roster.invalidate()
+    response_cache.invalidate()
+    return jsonify({'success': True})
+
+@app.route('/api/students/import', methods=['POST'])
+@require_auth
+def import_students_csv():
+    """Import students from a CSV upload (form field `file`) or a raw text/csv body.
+
+    Options (form fields or query args): batch, course, status (defaults for
+    rows without them) and dry_run=1 to validate without writing.
+    """
+    try:
+        options = request.form if request.files else request.args
+        defaults = {name: options.get(name) for name in ('batch', 'course', 'status')}
+        dry_run = options.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        
+        upload = request.files.get('file')
+        if request.files and upload is None:
+            return jsonify({'success': False, 'error': 'Upload the CSV in a form field named "file"'}), 400
+        # Decode as the rows are read rather than loading the whole file
+        raw = upload.stream if upload is not None else request.stream
+        stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        
+        # Filled in as chunks are written, so an error partway still reports them
+        report = ImportReport()
+        error = None
+        try:
+            import_students(supabase, stream, defaults, dry_run=dry_run, report=report)
+        except Exception as e:
+            error = e
+        finally:
+            stream.detach()
+        
+        # Rows written before an error stay written
+        if report.imported and not dry_run:
+            roster.invalidate()
+            response_cache.invalidate()
+        
+        if error is not None:
+            print(f"Import students error: {error}")
+            # Bad upload (header, encoding, CSV syntax) vs upstream failure
+            status = 400 if isinstance(error, (ValueError, csv.Error)) else 500
+            return jsonify({'success': False, 'error': str(error), 'dry_run': dry_run, **report.to_dict()}), status
+        
+        return jsonify({'success': True, 'dry_run': dry_run, **report.to_dict()})
+    
+    except Exception as e:
+        print(f"Import students error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ============= Attendance Routes =============
 
+# Student columns embedded in report rows, so reports don't need the roster
+EMBEDDED_STUDENT_COLUMNS = 'roll_number,first_name,last_name,batch,course'
+
+def filter_by_student(query, batch=None, course=None, columns=''):
+    """Limit an attendance query to one batch/course in the database (inner join on students).
+
+    With columns, each row also carries those student columns under 'students'.
+    """
+    if batch or course or columns:
+        query = query.join('students', columns)
+        if batch:
+            query = query.eq('students.batch', batch)
+        if course:
+            query = query.eq('students.course', course)
+    return query
+
+def attendance_cursor(rows, cursor=None):
+    """Latest marked_at among rows (ISO strings from PostgREST sort chronologically)"""
+    for row in rows:
+        marked_at = row.get('marked_at')
+        if marked_at and (cursor is None or marked_at > cursor):
+            cursor = marked_at
+    return cursor
+
+def attendance_cursor_floor(cursor):
+    # Re-read a short overlap behind the cursor: the trigger stamps marked_at when
+    # the row is written, but it only becomes visible at commit, so a slow bulk
+    # upsert can commit rows stamped just before the last cursor
+    marked_at = datetime.fromisoformat(cursor.replace('Z', '+00:00'))
+    return (marked_at - timedelta(seconds=ATTENDANCE_SYNC_OVERLAP)).isoformat()
+
+def get_attendance_changes(date, batch, since):
+    """Attendance rows for a date marked after the cursor, without the roster join"""
+    query = supabase.table('attendance') \
+        .select('id,student_id,status,remarks,marked_at') \
+        .eq('attendance_date', date)
+    if since:
+        query = query.gte('marked_at', attendance_cursor_floor(since))
+    rows = list(filter_by_student(query, batch).stream(keyset=('attendance_date', 'id')))
+    
+    changes = [{
+        'student_id': row['student_id'],
+        'status': row['status'],
+        'remarks': row['remarks'],
+        'attendance_id': row['id'],
+        'marked_at': row['marked_at']
+    } for row in rows]
+    return changes, attendance_cursor(rows, since or None)
+
 @app.route('/api/attendance/by-date', methods=['GET'])
 @require_auth
 def get_attendance_by_date():
@@ -273,17 +594,30 @@ def get_attendance_by_date():
         date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
         batch = request.args.get('batch')
         
-        # Get all active students
-        student_query = supabase.table('students').select('*').eq('status', 'active')
-        if batch:
-            student_query = student_query.eq('batch', batch)
+        # Delta mode: ?since=<cursor> returns only rows marked after the cursor
+        if 'since' in request.args:
+            since = request.args.get('since')
+            try:
+                changes, cursor = get_attendance_changes(date, batch, since)
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Invalid since cursor'}), 400
+            return jsonify({
+                'success': True,
+                'attendance_date': date,
+                'since': since,
+                'cursor': cursor,
+                'changes': changes
+            })
         
-        students_response = student_query.order('roll_number').execute()
-        students = students_response.data
+        # Get all active students
+        students = roster.get_students(batch=batch)
         
         # Get attendance records for the date
-        attendance_response = supabase.table('attendance').select('*').eq('attendance_date', date).execute()
-        attendance_dict = {a['student_id']: a for a in attendance_response.data}
+        attendance_query = supabase.table('attendance') \
+            .select('id, student_id, attendance_date, status, remarks, marked_at') \
+            .eq('attendance_date', date)
+        attendance_query = filter_by_student(attendance_query, batch)
+        attendance_dict = {a['student_id']: a for a in attendance_query.stream(keyset=('attendance_date', 'id'))}
         
         # Combine data
         result = []
@@ -310,12 +644,68 @@ def get_attendance_by_date():
             x['roll_number']
         ))
         
-        return jsonify({'success': True, 'attendance': result})
+        return jsonify({
+            'success': True,
+            'attendance': result,
+            'cursor': attendance_cursor(attendance_dict.values())
+        })
     
     except Exception as e:
         print(f"Get attendance error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def attendance_batches(rows):
+    """Batches of the students in these attendance rows, or None if the roster isn't cached"""
+    # Only from the cache: a write should not cost an extra upstream call
+    students = roster.get_students_by_ids([row['student_id'] for row in rows], fetch=False)
+    if students is None:
+        return None
+    return {student['batch'] for student in students.values()}
+
+def upsert_attendance_batch(attendance_records, date, admin_id):
+    """Validate and upsert one date's records; returns (marked_count, failed)"""
+    # Build one row per student; bad rows are reported instead of sent
+    # marked_at is left to the database (trg_attendance_marked_at), so every
+    # stamp comes from one clock
+    rows = []
+    failed = []
+    for record in attendance_records:
+        student_id = record.get('student_id') if isinstance(record, dict) else None
+        status = record.get('status') if isinstance(record, dict) else None
+        if not student_id:
+            failed.append({'student_id': student_id, 'error': 'Missing student_id'})
+            continue
+        if status not in ('present', 'absent'):
+            failed.append({'student_id': student_id, 'error': f'Invalid status: {status}'})
+            continue
+        rows.append({
+            'student_id': student_id,
+            'attendance_date': date,
+            'status': status,
+            'remarks': record.get('remarks', ''),
+            'marked_by': admin_id
+        })
+    
+    # A repeated student would make the upsert touch one row twice, which Postgres
+    # rejects for the whole chunk; the last record for a student wins
+    rows = list({row['student_id']: row for row in rows}.values())
+    
+    # Single upsert (chunked for very large batches) instead of one request per student
+    marked_count = 0
+    if rows:
+        response = supabase.table('attendance').upsert(
+            rows, on_conflict='student_id,attendance_date'
+        ).execute_bulk()
+        for item in response.failed:
+            failed.append({'student_id': rows[item['index']]['student_id'], 'error': item['error']})
+        marked_count = len(rows) - len(response.failed)
+        response_cache.invalidate_dates([date], attendance_batches(rows))
+    
+    if failed:
+        print(f"Mark attendance: {len(failed)} of {len(attendance_records)} records failed")
+    
+    return marked_count, failed
+
 @app.route('/api/attendance/mark', methods=['POST'])
 @require_auth
 def mark_attendance():
@@ -327,63 +717,119 @@ def mark_attendance():
         if not attendance_records:
             return jsonify({'success': False, 'error': 'No attendance records provided'}), 400
         
-        # Get all existing attendance records for this date
-        existing_attendance = {}
-        try:
-            existing_response = supabase.table('attendance').select('*').eq('attendance_date', date).execute()
-            for record in existing_response.data:
-                existing_attendance[record['student_id']] = record
-        except Exception as e:
-            print(f"Error fetching existing attendance: {e}")
-        
-        marked_count = 0
-        
-        for record in attendance_records:
-            try:
-                student_id = record['student_id']
-                status = record['status']
-                remarks = record.get('remarks', '')
-                
-                # Prepare attendance data
-                attendance_data = {
-                    'status': status,
-                    'remarks': remarks,
-                    'marked_by': session['admin_id'],
-                    'marked_at': datetime.now().isoformat()
-                }
-                
-                if student_id in existing_attendance:
-                    # Update existing record
-                    try:
-                        existing_id = existing_attendance[student_id]['id']
-                        supabase.table('attendance').update(attendance_data).eq('id', existing_id).execute()
-                        marked_count += 1
-                    except Exception as update_error:
-                        print(f"Error updating attendance for student {student_id}: {update_error}")
-                else:
-                    # Insert new record
-                    try:
-                        attendance_data['student_id'] = student_id
-                        attendance_data['attendance_date'] = date
-                        supabase.table('attendance').insert(attendance_data).execute()
-                        marked_count += 1
-                    except Exception as insert_error:
-                        print(f"Error inserting attendance for student {student_id}: {insert_error}")
-                
-            except Exception as record_error:
-                print(f"Error processing record: {record_error}")
-                continue
+        marked_count, failed = upsert_attendance_batch(attendance_records, date, session['admin_id'])
         
         return jsonify({
-            'success': True,
+            'success': marked_count > 0,
             'message': f'Attendance marked for {marked_count} students',
-            'count': marked_count
+            'count': marked_count,
+            'failed': failed
         })
     
     except Exception as e:
         print(f"Mark attendance error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+SYNC_PROTOCOL_VERSIONS = (1,)
+
+def parse_marked_at(value):
+    """Timezone-aware datetime for an ISO 8601 marked_at (naive values are taken as UTC)"""
+    marked_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return marked_at if marked_at.tzinfo else marked_at.replace(tzinfo=timezone.utc)
+
+def drop_superseded_records(attendance_records, date, base_cursor):
+    """Split off records marked since base_cursor, so a late offline replay can't overwrite them.
+
+    base_cursor is the delta-feed cursor (a database marked_at) the client had
+    seen when it queued the batch, or None if the date had no marks yet.
+    """
+    student_ids = [record['student_id'] for record in attendance_records
+                   if isinstance(record, dict) and record.get('student_id')]
+    newer = {
+        row['student_id']
+        for row in supabase.table('attendance').select('student_id,marked_at')
+            .eq('attendance_date', date).stream_in('student_id', student_ids)
+        if row['marked_at'] and (base_cursor is None or parse_marked_at(row['marked_at']) > base_cursor)
+    }
+    kept = [record for record in attendance_records
+            if not (isinstance(record, dict) and record.get('student_id') in newer)]
+    skipped = [{'student_id': student_id, 'error': 'Marked by someone else since this batch was queued'}
+               for student_id in sorted(newer)]
+    return kept, skipped
+
+@app.route('/api/v1/attendance/sync', methods=['POST'])
+@require_auth
+def sync_attendance():
+    """Replay target for the offline queue; each batch carries a client idempotency key"""
+    try:
+        data = request.get_json() or {}
+        version = data.get('version', 1)
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        attendance_records = data.get('attendance_records', [])
+        date = data.get('attendance_date')
+        # Only batches replayed from the offline queue carry the cursor they were marked against
+        replayed_offline = 'base_cursor' in data
+        base_cursor = data.get('base_cursor')
+        
+        if version not in SYNC_PROTOCOL_VERSIONS:
+            return jsonify({'success': False, 'error': f'Unsupported sync version: {version}'}), 400
+        if not isinstance(idempotency_key, str) or not idempotency_key or len(idempotency_key) > 100:
+            return jsonify({'success': False, 'error': 'A valid idempotency key is required'}), 400
+        if not date or not isinstance(attendance_records, list) or not attendance_records:
+            return jsonify({'success': False, 'error': 'attendance_date and attendance_records are required'}), 400
+        if base_cursor:
+            try:
+                base_cursor = parse_marked_at(base_cursor)
+            except (AttributeError, ValueError):
+                return jsonify({'success': False, 'error': 'Invalid base_cursor'}), 400
+        else:
+            base_cursor = None
+        
+        # Duplicate replay: answer from memory, then from the database, without re-applying
+        result = sync_results.get(idempotency_key)
+        if result is None:
+            existing = supabase.table('attendance_sync_batches').select('result') \
+                .eq('idempotency_key', idempotency_key).execute()
+            if existing.data:
+                result = existing.data[0]['result']
+                sync_results.set(idempotency_key, result)
+        if result is not None:
+            return jsonify(dict(result, replayed=True))
+        
+        skipped = []
+        if replayed_offline:
+            attendance_records, skipped = drop_superseded_records(attendance_records, date, base_cursor)
+        
+        marked_count, failed = 0, []
+        if attendance_records:
+            marked_count, failed = upsert_attendance_batch(attendance_records, date, session['admin_id'])
+        result = {
+            'success': marked_count > 0,
+            'version': version,
+            'idempotency_key': idempotency_key,
+            'attendance_date': date,
+            'count': marked_count,
+            'failed': failed,
+            'skipped': skipped
+        }
+        
+        # Only remember fully applied batches; partial failures may be retried with the same key
+        if not failed:
+            supabase.table('attendance_sync_batches').upsert({
+                'idempotency_key': idempotency_key,
+                'admin_id': session['admin_id'],
+                'attendance_date': date,
+                'record_count': marked_count,
+                'result': result
+            }, on_conflict='idempotency_key', ignore_duplicates=True).execute()
+            sync_results.set(idempotency_key, result)
+        
+        return jsonify(dict(result, replayed=False))
+    
+    except Exception as e:
+        print(f"Sync attendance error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ============= Reports Routes =============
 
 @app.route('/api/reports/summary', methods=['GET'])
@@ -397,33 +843,21 @@ def get_attendance_summary():
         if not start_date or not end_date:
             return jsonify({'success': False, 'error': 'Start and end dates required'}), 400
         
-        # Build query
-        query = supabase.table('attendance').select(
-            'id, student_id, attendance_date, status, students(roll_number, first_name, last_name, batch, course)'
-        ).gte('attendance_date', start_date).lte('attendance_date', end_date)
-        
-        response = query.execute()
-        records = response.data
-        
-        # Filter by batch if specified
-        if batch:
-            records = [r for r in records if r['students']['batch'] == batch]
+        # Aggregate per date in the database
+        response = supabase.rpc('attendance_counts_by_date', {
+            'p_start': start_date,
+            'p_end': end_date,
+            'p_batch': batch
+        }, read_only=True).execute()
+        by_date = response.data or []
         
         # Calculate statistics
-        total_records = len(records)
-        present_count = sum(1 for r in records if r['status'] == 'present')
-        absent_count = sum(1 for r in records if r['status'] == 'absent')
+        total_records = sum(d['total'] for d in by_date)
+        present_count = sum(d['present'] for d in by_date)
+        absent_count = sum(d['absent'] for d in by_date)
         
-        # By date
-        by_date = {}
-        for record in records:
-            date = record['attendance_date']
-            if date not in by_date:
-                by_date[date] = {'present': 0, 'absent': 0}
-            by_date[date][record['status']] += 1
-        
-        date_wise = [{'date': k, 'present': v['present'], 'absent': v['absent']} 
-                     for k, v in sorted(by_date.items())]
+        date_wise = [{'date': d['attendance_date'], 'present': d['present'], 'absent': d['absent']} 
+                     for d in by_date]
         
         return jsonify({
             'success': True,
@@ -442,6 +876,7 @@ def get_attendance_summary():
 
 @app.route('/api/reports/daily/<date>', methods=['GET'])
 @require_auth
+@cached_report(lambda date: (date, date), by_batch=True)
 def get_daily_report(date):
     try:
         batch = request.args.get('batch')
@@ -449,75 +884,39 @@ def get_daily_report(date):
         
         print(f"Daily report: {date}, Batch: {batch}, Course: {course}")
         
-        # Get attendance for the date
-        query = supabase.table('attendance').select('*').eq('attendance_date', date)
-        response = query.execute()
-        records = response.data or []
-        
-        print(f"Found {len(records)} attendance records")
+        # Stream the date's attendance page by page with each student's details embedded;
+        # batch/course are filtered in the database
+        query = supabase.table('attendance').select('id, student_id, attendance_date, status, remarks') \
+            .eq('attendance_date', date)
+        query = filter_by_student(query, batch, course, EMBEDDED_STUDENT_COLUMNS)
         
-        if not records:
-            return jsonify({
-                'success': True,
-                'date': date,
-                'batch': batch or 'All',
-                'course': course or 'All',
-                'stats': {
-                    'total': 0,
-                    'present': 0,
-                    'absent': 0,
-                    'percentage': 0
-                },
-                'students': []
+        present = 0
+        absent = 0
+        students_data = []
+        for record in query.stream(keyset=('attendance_date', 'id')):
+            student = record['students']
+            
+            if record['status'] == 'present':
+                present += 1
+            elif record['status'] == 'absent':
+                absent += 1
+            
+            students_data.append({
+                'roll_number': student['roll_number'],
+                'first_name': student['first_name'],
+                'last_name': student['last_name'],
+                'batch': student['batch'],
+                'course': student['course'],
+                'status': record['status'],
+                'remarks': record.get('remarks', '')
             })
         
-        # Get student IDs to fetch student details
-        student_ids = list(set(r['student_id'] for r in records if r.get('student_id')))
-        
-        # Fetch student details
-        students_dict = {}
-        if student_ids:
-            students_response = supabase.table('students').select('*').execute()
-            for student in students_response.data:
-                students_dict[student['id']] = student
-        
-        # Filter and enrich records with student data
-        filtered_records = []
-        for record in records:
-            student_id = record.get('student_id')
-            if student_id in students_dict:
-                student = students_dict[student_id]
-                
-                # Apply filters
-                if batch and student['batch'] != batch:
-                    continue
-                if course and student['course'] != course:
-                    continue
-                
-                filtered_records.append({
-                    'record': record,
-                    'student': student
-                })
+        print(f"Found {len(students_data)} attendance records")
         
         # Calculate stats
-        present = sum(1 for r in filtered_records if r['record']['status'] == 'present')
-        absent = sum(1 for r in filtered_records if r['record']['status'] == 'absent')
-        total = len(filtered_records)
+        total = len(students_data)
         percentage = round((present / total * 100) if total > 0 else 0, 1)
         
-        # Format student data
-        students_data = []
-        for item in filtered_records:
-            students_data.append({
-                'roll_number': item['student']['roll_number'],
-                'first_name': item['student']['first_name'],
-                'last_name': item['student']['last_name'],
-                'batch': item['student']['batch'],
-                'course': item['student']['course'],
-                'status': item['record']['status'],
-                'remarks': item['record'].get('remarks', '')
-            })
-        
         return jsonify({
             'success': True,
             'date': date,
@@ -540,10 +939,9 @@ def get_daily_report(date):
 
 @app.route('/api/reports/monthly/<int:year>/<int:month>', methods=['GET'])
 @require_auth
+@cached_report(month_range, by_batch=True)
 def get_monthly_report(year, month):
     try:
-        from calendar import monthrange
-        
         batch = request.args.get('batch')
         course = request.args.get('course')
         
@@ -557,79 +955,32 @@ def get_monthly_report(year, month):
         
         print(f"Monthly report: {year}-{month}, Range: {start_date} to {end_date}, Batch: {batch}, Course: {course}")
         
-        # Get attendance for the month - simplified query without nested select
-        query = supabase.table('attendance').select('*').gte('attendance_date', start_date).lte('attendance_date', end_date)
-        response = query.execute()
-        records = response.data or []
-        
-        print(f"Found {len(records)} attendance records")
-        
-        # If no records, return empty report
-        if not records:
-            return jsonify({
-                'success': True,
-                'year': year,
-                'month': month,
-                'batch': batch or 'All',
-                'course': course or 'All',
-                'stats': {
-                    'total': 0,
-                    'present': 0,
-                    'absent': 0,
-                    'percentage': 0
-                },
-                'daily': []
-            })
+        # Per-date counts from the daily rollup table
+        response = supabase.rpc('attendance_rollup_by_date', {
+            'p_start': start_date,
+            'p_end': end_date,
+            'p_batch': batch,
+            'p_course': course
+        }, read_only=True).execute()
+        by_date = response.data or []
         
-        # Get student IDs to fetch student details
-        student_ids = list(set(r['student_id'] for r in records if r.get('student_id')))
-        
-        # Fetch student details
-        students_dict = {}
-        if student_ids:
-            students_response = supabase.table('students').select('*').execute()
-            for student in students_response.data:
-                students_dict[student['id']] = student
-        
-        # Filter records by batch/course and enrich with student data
-        filtered_records = []
-        for record in records:
-            student_id = record.get('student_id')
-            if student_id in students_dict:
-                student = students_dict[student_id]
-                
-                # Apply filters
-                if batch and student['batch'] != batch:
-                    continue
-                if course and student['course'] != course:
-                    continue
-                
-                record['student'] = student
-                filtered_records.append(record)
+        print(f"Found {len(by_date)} days with attendance")
         
         # Calculate overall stats
-        present = sum(1 for r in filtered_records if r['status'] == 'present')
-        absent = sum(1 for r in filtered_records if r['status'] == 'absent')
-        total = len(filtered_records)
+        present = sum(d['present'] for d in by_date)
+        absent = sum(d['absent'] for d in by_date)
+        total = present + absent
         percentage = round((present / total * 100) if total > 0 else 0, 1)
         
-        # Group by date
-        by_date = {}
-        for record in filtered_records:
-            date = record['attendance_date']
-            if date not in by_date:
-                by_date[date] = {'present': 0, 'absent': 0}
-            by_date[date][record['status']] += 1
-        
         daily_stats = [
             {
-                'date': date,
-                'present': stats['present'],
-                'absent': stats['absent'],
-                'total': stats['present'] + stats['absent'],
-                'percentage': round((stats['present'] / (stats['present'] + stats['absent']) * 100) if (stats['present'] + stats['absent']) > 0 else 0, 1)
+                'date': d['attendance_date'],
+                'present': d['present'],
+                'absent': d['absent'],
+                'total': d['present'] + d['absent'],
+                'percentage': round((d['present'] / (d['present'] + d['absent']) * 100) if (d['present'] + d['absent']) > 0 else 0, 1)
             }
-            for date, stats in sorted(by_date.items())
+            for d in by_date
         ]
         
         return jsonify({
@@ -653,6 +1004,9 @@ def get_monthly_report(year, month):
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Student fields the per-student reports show
+STUDENT_REPORT_COLUMNS = 'id,roll_number,first_name,last_name,batch,course,status'
+
 @app.route('/api/reports/student/<student_id>', methods=['GET'])
 @require_auth
 def get_student_report(student_id):
@@ -660,26 +1014,29 @@ def get_student_report(student_id):
         from_date = request.args.get('from_date')
         to_date = request.args.get('to_date')
         
-        # Get student info
-        student_response = supabase.table('students').select('*').eq('id', student_id).execute()
-        if not student_response.data:
+        # Get student info (from the roster cache, or just this student's row)
+        student = next(iter(roster.get_students_by_ids([student_id], STUDENT_REPORT_COLUMNS).values()), None)
+        if not student:
             return jsonify({'success': False, 'error': 'Student not found'}), 404
         
-        student = student_response.data[0]
-        
         # Get attendance records
-        query = supabase.table('attendance').select('*').eq('student_id', student_id)
+        query = supabase.table('attendance').select('id, attendance_date, status, remarks, marked_at') \
+            .eq('student_id', student['id'])
         if from_date:
             query = query.gte('attendance_date', from_date)
         if to_date:
             query = query.lte('attendance_date', to_date)
         
-        response = query.order('attendance_date', desc=True).execute()
-        records = response.data
+        # Page through the student's history so PostgREST's row cap can't truncate it
+        records = []
+        present = 0
+        absent = 0
+        for page in query.order('attendance_date', desc=True).iter_pages():
+            records.extend(page)
+            present += sum(1 for r in page if r['status'] == 'present')
+            absent += sum(1 for r in page if r['status'] == 'absent')
         
         # Calculate stats
-        present = sum(1 for r in records if r['status'] == 'present')
-        absent = sum(1 for r in records if r['status'] == 'absent')
         total = len(records)
         percentage = round((present / total * 100) if total > 0 else 0, 1)
         
@@ -706,29 +1063,351 @@ def get_student_report(student_id):
         print(f"Get student report error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-# ============= Dashboard Compatibility Routes =============
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+HISTORY_WINDOWS = (7, 30, 90)
+HISTORY_DATE_ARGS = ('start_date', 'end_date', 'cursor')
+# Stand-ins for an open start/end; ranges this long are invalidated by a write to any date
+HISTORY_EARLIEST = '0001-01-01'
+HISTORY_LATEST = '9999-12-31'
 
-@app.route('/api/students/stats/overview', methods=['GET'])
+def is_iso_date(value):
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def history_range(student_id):
+    if not all(is_iso_date(request.args[name]) for name in HISTORY_DATE_ARGS if request.args.get(name)):
+        raise ValueError('invalid history date')
+    return request.args.get('start_date') or HISTORY_EARLIEST, request.args.get('end_date') or HISTORY_LATEST
+
+@app.route('/api/reports/student/<student_id>/history', methods=['GET'])
 @require_auth
-def get_dashboard_student_stats():
+@cached_report(history_range)
+def get_student_history(student_id):
     try:
-        # Get all active students
-        response = supabase.table('students').select('*').eq('status', 'active').execute()
-        students = response.data
+        for name in HISTORY_DATE_ARGS:
+            value = request.args.get(name)
+            if value and not is_iso_date(value):
+                return jsonify({'success': False, 'error': f'Invalid {name} (expected YYYY-MM-DD)'}), 400
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        cursor = request.args.get('cursor')
+        try:
+            limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid limit'}), 400
         
-        # Calculate batch distribution
-        by_batch = {}
-        for student in students:
-            batch = student['batch']
-            by_batch[batch] = by_batch.get(batch, 0) + 1
+        student = next(iter(roster.get_students_by_ids([student_id], STUDENT_REPORT_COLUMNS).values()), None)
+        if not student:
+            return jsonify({'success': False, 'error': 'Student not found'}), 404
+        student_id = student['id']
+        
+        # Newest first; the cursor is the last attendance_date already seen
+        # (unique per student, so it is a stable keyset)
+        query = supabase.table('attendance').select('id, attendance_date, status, remarks, marked_at') \
+            .eq('student_id', student_id)
+        if start_date:
+            query = query.gte('attendance_date', start_date)
+        if end_date:
+            query = query.lte('attendance_date', end_date)
+        if cursor:
+            query = query.lt('attendance_date', cursor)
+        
+        # Fetch one extra row to know whether another page exists
+        records = query.order('attendance_date', desc=True).limit(limit + 1).execute().data
+        has_more = len(records) > limit
+        records = records[:limit]
+        
+        result = {
+            'success': True,
+            'student': {
+                'id': student['id'],
+                'roll_number': student['roll_number'],
+                'first_name': student['first_name'],
+                'last_name': student['last_name'],
+                'batch': student['batch'],
+                'course': student['course']
+            },
+            'attendance': records,
+            'next_cursor': records[-1]['attendance_date'] if has_more else None,
+            'has_more': has_more
+        }
+        
+        # Aggregates only on the first page; later pages just append records
+        if not cursor:
+            summary = supabase.rpc('student_attendance_summary', {
+                'p_student_id': student_id,
+                'p_start': start_date,
+                'p_end': end_date
+            }, read_only=True).execute().data
+            summary = summary[0] if summary else {'present': 0, 'absent': 0, 'total': 0}
+            result['summary'] = {
+                'total_days': summary['total'],
+                'present_days': summary['present'],
+                'absent_days': summary['absent'],
+                'attendance_percentage': round((summary['present'] / summary['total'] * 100) if summary['total'] > 0 else 0, 1)
+            }
+            
+            windows = supabase.rpc('student_attendance_windows', {
+                'p_student_id': student_id,
+                'p_as_of': end_date or datetime.now().strftime('%Y-%m-%d'),
+                'p_days': list(HISTORY_WINDOWS)
+            }, read_only=True).execute().data
+            result['windows'] = [
+                {
+                    'days': w['days'],
+                    'present': w['present'],
+                    'absent': w['absent'],
+                    'total': w['total'],
+                    'percentage': round((w['present'] / w['total'] * 100) if w['total'] > 0 else 0, 1)
+                }
+                for w in windows
+            ]
         
-        batch_distribution = [{'batch': k, 'count': v} for k, v in by_batch.items()]
-        batch_distribution.sort(key=lambda x: (0 if x['batch'] == 'KL University' else 1, x['batch']))
+        return jsonify(result)
+    
+    except Exception as e:
+        print(f"Get student history error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+AT_RISK_DEFAULT_DAYS = 30
+AT_RISK_MAX_DAYS = 366
+
+@app.route('/api/reports/at-risk', methods=['GET'])
+@require_auth
+@cached_report(at_risk_range, by_batch=True)
+def get_at_risk_report():
+    try:
+        batch = request.args.get('batch')
+        course = request.args.get('course')
+        try:
+            start_date, end_date = at_risk_range()
+            dates = date_range(start_date, end_date)
+            threshold = float(request.args.get('threshold', 75))
+            # A percentage; float() also accepts nan and inf
+            if not 0 <= threshold <= 100:
+                raise ValueError(threshold)
+            limit = request.args.get('limit')
+            limit = max(int(limit), 1) if limit else None
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid date range, threshold or limit'}), 400
+        if not dates or len(dates) > AT_RISK_MAX_DAYS:
+            return jsonify({'success': False, 'error': f'Window must be 1 to {AT_RISK_MAX_DAYS} days'}), 400
+        
+        # One aggregated pass in SQL: a status string per student for the window,
+        # decoded straight into the matrix (pages are per student, not per record)
+        query = supabase.rpc('attendance_status_strings', {
+            'p_start': start_date,
+            'p_end': end_date,
+            'p_batch': batch,
+            'p_course': course
+        }, read_only=True)
+        students = roster.get_students(batch=batch, course=course)
+        matrix = AttendanceMatrix.from_status_strings(
+            students, dates, query.stream(keyset=('student_id',))
+        )
+        at_risk_count, at_risk = matrix.at_risk(threshold, batch=batch, course=course, limit=limit)
         
         return jsonify({
-            'total': len(students),
-            'byBatch': batch_distribution
+            'success': True,
+            'start_date': start_date,
+            'end_date': end_date,
+            'batch': batch or 'All',
+            'course': course or 'All',
+            'threshold': threshold,
+            'students_checked': len(students),
+            'at_risk_count': at_risk_count,
+            'students': at_risk
         })
+    
+    except Exception as e:
+        print(f"Get at-risk report error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ============= Export Routes =============
+
+EXPORT_COLUMNS = ['Date', 'Roll Number', 'First Name', 'Last Name', 'Batch', 'Course', 'Status', 'Remarks']
+
+def iter_export_rows(start_date, end_date, batch=None, course=None):
+    # Attendance is streamed page by page with each student's details embedded,
+    # already filtered to the batch/course
+    query = supabase.table('attendance').select('id, student_id, attendance_date, status, remarks') \
+        .gte('attendance_date', start_date).lte('attendance_date', end_date)
+    query = filter_by_student(query, batch, course, EMBEDDED_STUDENT_COLUMNS)
+    
+    for record in query.stream(keyset=('attendance_date', 'id')):
+        student = record['students']
+        yield [
+            record['attendance_date'],
+            student['roll_number'],
+            student['first_name'],
+            student['last_name'],
+            student['batch'],
+            student['course'],
+            record['status'],
+            record.get('remarks') or ''
+        ]
+
+def iter_csv(rows, compress=False, flush_every=500):
+    # Encode rows into CSV chunks (optionally gzip) so the response never holds the whole export
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+        return compressor.compress(data) if compressor else data
+    
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_every:
+            pending = 0
+            chunk = drain()
+            if chunk:
+                yield chunk
+    
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+def export_response(rows, filename):
+    export_format = request.args.get('format', 'csv')
+    if export_format != 'csv':
+        return jsonify({'success': False, 'error': f'Unsupported export format: {export_format}'}), 400
+    
+    compress = request.args.get('compress') == 'gzip'
+    if compress:
+        filename += '.gz'
+    
+    return Response(
+        stream_with_context(iter_csv(rows, compress=compress)),
+        mimetype='application/gzip' if compress else 'text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/reports/export/monthly/<int:month>/<int:year>', methods=['GET'])
+@require_auth
+def export_monthly_report(month, year):
+    try:
+        if month < 1 or month > 12:
+            return jsonify({'success': False, 'error': 'Invalid month'}), 400
+        
+        batch = request.args.get('batch')
+        course = request.args.get('course')
+        
+        start_date = f"{year}-{month:02d}-01"
+        end_date = f"{year}-{month:02d}-{monthrange(year, month)[1]}"
+        
+        rows = iter_export_rows(start_date, end_date, batch, course)
+        return export_response(rows, f"attendance_{year}_{month:02d}.csv")
+    
+    except Exception as e:
+        print(f"Export monthly report error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/reports/export/daily/<date>', methods=['GET'])
+@require_auth
+def export_daily_report(date):
+    try:
+        batch = request.args.get('batch')
+        course = request.args.get('course')
+        
+        rows = iter_export_rows(date, date, batch, course)
+        return export_response(rows, f"attendance_{date}.csv")
+    
+    except Exception as e:
+        print(f"Export daily report error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ============= Dashboard Compatibility Routes =============
+
+def compute_student_overview():
+    # Get all active students
+    students = roster.get_students()
+    
+    # Calculate batch distribution
+    by_batch = {}
+    for student in students:
+        batch = student['batch']
+        by_batch[batch] = by_batch.get(batch, 0) + 1
+    
+    batch_distribution = [{'batch': k, 'count': v} for k, v in by_batch.items()]
+    batch_distribution.sort(key=lambda x: (0 if x['batch'] == 'KL University' else 1, x['batch']))
+    
+    return {
+        'total': len(students),
+        'byBatch': batch_distribution
+    }
+
+def compute_attendance_overview(date):
+    # Get total active students (denominator)
+    total_students = len(roster.get_students())
+    
+    # Get attendance counts for date from the daily rollup table
+    rollup = supabase.rpc('attendance_rollup_by_date', {
+        'p_start': date,
+        'p_end': date
+    }, read_only=True).execute().data
+    
+    present = rollup[0]['present'] if rollup else 0
+    absent = rollup[0]['absent'] if rollup else 0
+    
+    percentage = 0
+    if total_students > 0:
+        percentage = round((present / total_students) * 100, 1)
+    
+    return {
+        'present': present,
+        'absent': absent,
+        'percentage': percentage,
+        'total': total_students
+    }
+
+def compute_trends(days):
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days-1)
+    
+    start_str = start_date.strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
+    
+    # Per-date counts from the daily rollup table
+    response = supabase.rpc('attendance_rollup_by_date', {
+        'p_start': start_str,
+        'p_end': end_str
+    }, read_only=True).execute()
+    
+    # Group by date
+    daily_stats = {}
+    # Initialize all dates in range with 0
+    curr = start_date
+    while curr <= end_date:
+        d_str = curr.strftime('%Y-%m-%d')
+        daily_stats[d_str] = {'date': d_str, 'present': 0, 'absent': 0}
+        curr += timedelta(days=1)
+    
+    for row in response.data:
+        d = row['attendance_date']
+        if d in daily_stats:
+            daily_stats[d]['present'] = row['present']
+            daily_stats[d]['absent'] = row['absent']
+    
+    return list(daily_stats.values())
+
+@app.route('/api/students/stats/overview', methods=['GET'])
+@require_auth
+def get_dashboard_student_stats():
+    try:
+        return jsonify(compute_student_overview())
     except Exception as e:
         print(f"Dashboard student stats error: {e}")
         return jsonify({'total': 0, 'byBatch': []}), 500
@@ -738,78 +1417,107 @@ def get_dashboard_student_stats():
 def get_dashboard_attendance_stats():
     try:
         date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
-        
-        # Get total active students (denominator)
-        students_resp = supabase.table('students').select('id').eq('status', 'active').execute()
-        total_students = len(students_resp.data)
-        
-        # Get attendance for date
-        attendance_resp = supabase.table('attendance').select('status').eq('attendance_date', date).execute()
-        
-        present = sum(1 for r in attendance_resp.data if r['status'] == 'present')
-        absent = sum(1 for r in attendance_resp.data if r['status'] == 'absent')
-        
-        percentage = 0
-        if total_students > 0:
-            percentage = round((present / total_students) * 100, 1)
-            
-        return jsonify({
-            'present': present,
-            'absent': absent,
-            'percentage': percentage,
-            'total': total_students
-        })
+        return jsonify(compute_attendance_overview(date))
     except Exception as e:
         print(f"Dashboard attendance stats error: {e}")
         return jsonify({'present': 0, 'absent': 0, 'percentage': 0}), 500
 
 @app.route('/api/reports/trends', methods=['GET'])
 @require_auth
+@cached_report(trends_range)
 def get_dashboard_trends():
     try:
-        days = int(request.args.get('days', 7))
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days-1)
-        
-        start_str = start_date.strftime('%Y-%m-%d')
-        end_str = end_date.strftime('%Y-%m-%d')
-        
-        # Get all attendance in range
-        response = supabase.table('attendance').select('attendance_date, status') \
-            .gte('attendance_date', start_str) \
-            .lte('attendance_date', end_str) \
-            .execute()
-            
-        # Group by date
-        daily_stats = {}
-        # Initialize all dates in range with 0
-        curr = start_date
-        while curr <= end_date:
-            d_str = curr.strftime('%Y-%m-%d')
-            daily_stats[d_str] = {'date': d_str, 'present': 0, 'absent': 0}
-            curr += timedelta(days=1)
-            
-        for record in response.data:
-            d = record['attendance_date']
-            s = record['status']
-            if d in daily_stats:
-                if s == 'present': daily_stats[d]['present'] += 1
-                elif s == 'absent': daily_stats[d]['absent'] += 1
-                
-        return jsonify(list(daily_stats.values()))
+        return jsonify(compute_trends(trends_days()))
     except Exception as e:
         print(f"Dashboard trends error: {e}")
         return jsonify([]), 500
 
+def timed_section(func, *args):
+    # Runs in the dashboard pool; returns (result, error, elapsed ms)
+    start = time.perf_counter()
+    try:
+        return func(*args), None, round((time.perf_counter() - start) * 1000, 2)
+    except Exception as e:
+        return None, str(e), round((time.perf_counter() - start) * 1000, 2)
+
+@app.route('/api/dashboard', methods=['GET'])
+@require_auth
+def get_dashboard():
+    try:
+        date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+        days = trends_days()
+        
+        start = time.perf_counter()
+        
+        # Fan the independent sections out so load time tracks the slowest one
+        futures = {
+            'students': metrics.submit(dashboard_executor, timed_section, compute_student_overview),
+            'attendance': metrics.submit(dashboard_executor, timed_section, compute_attendance_overview, date),
+            'trends': metrics.submit(dashboard_executor, timed_section, compute_trends, days)
+        }
+        
+        result = {'success': True, 'timing': {}, 'errors': {}}
+        fallbacks = {
+            'students': {'total': 0, 'byBatch': []},
+            'attendance': {'present': 0, 'absent': 0, 'percentage': 0},
+            'trends': []
+        }
+        for name, future in futures.items():
+            data, error, elapsed = future.result()
+            result[name] = data if error is None else fallbacks[name]
+            result['timing'][name] = elapsed
+            if error is not None:
+                print(f"Dashboard {name} error: {error}")
+                result['errors'][name] = error
+        
+        result['timing']['total'] = round((time.perf_counter() - start) * 1000, 2)
+        result['success'] = not result['errors']
+        return jsonify(result)
+    
+    except Exception as e:
+        print(f"Dashboard error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ============= Metrics Routes =============
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    elif 'admin_id' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+# ============= Health Routes =============
+
+def warm_active_roster():
+    # Attendance marking and every report
+    roster.get_students()
+
+def warm_full_roster():
+    # Students page
+    roster.get_students(status=None)
+
+health_state = health.init_health(app, supabase, warmup_steps=[warm_active_roster, warm_full_roster])
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(e):
+    # Unknown API paths get a real 404 rather than the single-page app
+    if request.path.startswith('/api/'):
+        return jsonify({'success': False, 'error': 'Not found'}), 404
     return send_from_directory(app.static_folder, 'index.html')
 
 @app.errorhandler(500)
 def server_error(e):
     return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
+health_state.set_import_time(time.perf_counter() - APP_IMPORT_STARTED)
+print(f"App imported in {health_state.import_seconds * 1000:.0f} ms")
+
 if __name__ == '__main__':
     # For local development
     app.run(host='0.0.0.0', port=3000, debug=True)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Benchmark the hot API routes of app.py against a local fake PostgREST
+Usage: python benchmarks/app_routes.py [--students 5000] [--days 180] [--iterations 20] [--concurrency 1]
+
+Seeds benchmarks/fake_postgrest.py with a generated dataset and starts
+app.py in a separate process pointed at it. The script logs in, then
+times each route. It reports p50/p95 latency, upstream (PostgREST) calls
+and bytes per request, and the app's peak RSS as JSON, so runs can be
+compared across commits.
+
+With --concurrency N each iteration fires N identical requests at once
+(the morning rush on one page); --no-coalesce runs the app with
+SUPABASE_COALESCE=0 for comparison.
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import fake_postgrest
+
+APP_LAUNCHER = (
+    "import sys, app; "
+    "app.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True, use_reloader=False)"
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_app(supabase_url, port, coalesce=True):
+    env = dict(os.environ)
+    env.update({
+        'SUPABASE_URL': supabase_url,
+        'SUPABASE_KEY': 'benchmark-key',
+        'SECRET_KEY': 'benchmark-secret',
+        'FLASK_DEBUG': '0',
+        'SUPABASE_COALESCE': '1' if coalesce else '0'
+    })
+    process = subprocess.Popen(
+        [sys.executable, '-c', APP_LAUNCHER, str(port)],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('app.py exited during startup')
+        try:
+            requests.get(f'{base_url}/api/auth/check', timeout=1)
+            return process, base_url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('app.py did not start within 30s')
+
+
+def peak_rss_mb(process):
+    # VmHWM is the high-water mark of the still-running process (Linux only)
+    try:
+        with open(f'/proc/{process.pid}/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def build_scenarios(students, end):
+    day = end.isoformat()
+    month_start = end.replace(day=1)
+    last_month = month_start - timedelta(days=1)
+    records = [{'student_id': s['id'], 'status': 'present', 'remarks': ''} for s in students]
+
+    return [
+        ('attendance_by_date', 'GET', f'/api/attendance/by-date?date={day}', None),
+        ('attendance_mark', 'POST', '/api/attendance/mark',
+         {'attendance_date': day, 'attendance_records': records}),
+        ('reports_monthly', 'GET', f'/api/reports/monthly/{last_month.year}/{last_month.month}', None),
+        ('reports_summary', 'GET',
+         f'/api/reports/summary?startDate={(end - timedelta(days=29)).isoformat()}&endDate={day}', None),
+        ('reports_at_risk', 'GET', f'/api/reports/at-risk?endDate={day}&days=30&threshold=75&limit=50', None),
+        ('students_overview', 'GET', '/api/students/stats/overview', None),
+        ('attendance_overview', 'GET', f'/api/attendance/stats/overview?date={day}', None),
+        ('dashboard', 'GET', f'/api/dashboard?date={day}', None),
+    ]
+
+
+def timed_request(http, method, url, body):
+    start = time.perf_counter()
+    response = http.request(method, url, json=body)
+    response.content
+    return (time.perf_counter() - start) * 1000, response.status_code
+
+
+def run_scenario(clients, db, base_url, scenario, iterations, warmup):
+    name, method, path, body = scenario
+    for _ in range(warmup):
+        clients[0].request(method, base_url + path, json=body)
+
+    samples = []
+    errors = 0
+    with db.lock:
+        calls_before, bytes_before = db.calls, db.bytes_sent
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        for _ in range(iterations):
+            # One request per client, all in flight together
+            for elapsed, status in pool.map(lambda http: timed_request(http, method, base_url + path, body), clients):
+                samples.append(elapsed)
+                if status >= 400:
+                    errors += 1
+    with db.lock:
+        calls, sent = db.calls - calls_before, db.bytes_sent - bytes_before
+    requests_made = len(samples)
+
+    return {
+        'route': name,
+        'method': method,
+        'path': path.split('?')[0],
+        'requests': requests_made,
+        'errors': errors,
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'upstream_calls_per_request': round(calls / requests_made, 2),
+        'upstream_bytes_per_request': int(sent / requests_made)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='identical requests in flight at once per iteration')
+    parser.add_argument('--no-coalesce', action='store_true',
+                        help='run the app with upstream request coalescing disabled')
+    parser.add_argument('--latency-ms', type=float, default=1.0,
+                        help='simulated network round trip per PostgREST call')
+    parser.add_argument('--routes', help='comma-separated subset of route names')
+    parser.add_argument('--output', help='write JSON here as well as to stdout')
+    args = parser.parse_args()
+
+    end = date.today()
+    seed_start = time.perf_counter()
+    db = fake_postgrest.seed(fake_postgrest.FakeDatabase(), args.students, args.days, end=end)
+    seed_seconds = time.perf_counter() - seed_start
+    server = fake_postgrest.serve(db, latency_ms=args.latency_ms)
+
+    process, base_url = start_app(f'http://127.0.0.1:{server.server_port}', free_port(),
+                                  coalesce=not args.no_coalesce)
+    try:
+        http = requests.Session()
+        login = http.post(f'{base_url}/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+        if login.status_code != 200:
+            raise RuntimeError(f'login failed: {login.text}')
+        # requests.Session isn't thread-safe: one per concurrent client, sharing the login cookie
+        clients = [http]
+        for _ in range(max(args.concurrency, 1) - 1):
+            client = requests.Session()
+            client.cookies.update(http.cookies)
+            clients.append(client)
+
+        scenarios = build_scenarios(db.tables['students'], end)
+        if args.routes:
+            wanted = set(args.routes.split(','))
+            scenarios = [scenario for scenario in scenarios if scenario[0] in wanted]
+
+        results = [run_scenario(clients, db, base_url, scenario, args.iterations, args.warmup)
+                   for scenario in scenarios]
+        rss = peak_rss_mb(process)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        server.shutdown()
+
+    if rss is None:
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        rss = round(maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+    report = {
+        'benchmark': 'app_routes',
+        'commit': git_commit(),
+        'config': {
+            'students': args.students,
+            'days': args.days,
+            'attendance_rows': len(db.tables['attendance']),
+            'iterations': args.iterations,
+            'concurrency': max(args.concurrency, 1),
+            'coalesce': not args.no_coalesce,
+            'latency_ms': args.latency_ms,
+            'seed_seconds': round(seed_seconds, 2)
+        },
+        'peak_rss_mb': rss,
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark AttendanceMatrix against the per-record dict loops reports used to run
+Usage: python benchmarks/attendance_matrix.py [--students 5000] [--days 180]
+
+Both sides start from the same list of PostgREST-style attendance records and
+compute batch-filtered per-student percentages, as the at-risk report does.
+`ms` includes building the matrix; `reduce_ms` is the reductions alone.
+Timings (best of --repeat) and tracemalloc peaks are printed as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+from analytics import AttendanceMatrix
+
+
+def generate(students_count, days, seed=42):
+    rng = random.Random(seed)
+    batches = ('KL University', 'Diet College')
+    courses = ('Computer Science', 'Electronics', 'Mechanical', 'Calibo Training')
+    students = [{
+        'id': f'00000000-0000-4000-8000-{i:012d}',
+        'roll_number': f'22{i:08d}',
+        'first_name': f'First{i}',
+        'last_name': f'Last{i}',
+        'batch': batches[i % len(batches)],
+        'course': courses[i % len(courses)],
+        'status': 'active'
+    } for i in range(students_count)]
+
+    end = date(2026, 6, 30)
+    start = end - timedelta(days=days - 1)
+    records = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        for student in students:
+            records.append({
+                'id': f'{offset}-{student["id"]}',
+                'student_id': student['id'],
+                'attendance_date': day,
+                'status': 'absent' if rng.random() < 0.15 else 'present',
+                'remarks': '',
+                'marked_at': f'{day}T09:00:00+00:00'
+            })
+    return students, records, start.isoformat(), end.isoformat()
+
+
+def dict_loops(students, records, batch):
+    """The original report code path: enrich every record, then aggregate in Python"""
+    students_dict = {student['id']: student for student in students}
+    filtered = []
+    for record in records:
+        student = students_dict.get(record['student_id'])
+        if student is None or (batch and student['batch'] != batch):
+            continue
+        record = dict(record)
+        record['student'] = student
+        filtered.append(record)
+
+    by_student = {}
+    for record in filtered:
+        entry = by_student.setdefault(record['student_id'], {'present': 0, 'absent': 0})
+        entry[record['status']] += 1
+    percentages = {
+        student_id: analytics.percentage(c['present'], c['present'] + c['absent'])
+        for student_id, c in by_student.items()
+    }
+    return percentages
+
+
+def matrix_reductions(students, records, start, end, batch, use_numpy):
+    matrix = AttendanceMatrix.from_records(students, records, start, end, use_numpy=use_numpy)
+    percentages = {row['student_id']: row['percentage'] for row in matrix.student_percentages(batch=batch)}
+    return percentages, matrix
+
+
+def measure(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, round(best * 1000, 2), round(peak / (1024 * 1024), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--batch', default='KL University')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    students, records, start, end = generate(args.students, args.days)
+
+    baseline, baseline_ms, baseline_mb = measure(lambda: dict_loops(students, records, args.batch), args.repeat)
+    results = [{'implementation': 'dict_loops', 'ms': baseline_ms, 'peak_mb': baseline_mb}]
+
+    backends = [('matrix_bytes', False)] + ([('matrix_numpy', True)] if analytics.np is not None else [])
+    for name, use_numpy in backends:
+        result, ms, peak = measure(
+            lambda: matrix_reductions(students, records, start, end, args.batch, use_numpy), args.repeat
+        )
+        if result[0] != baseline:
+            raise RuntimeError(f'{name} disagrees with the dict loops')
+        # Reductions alone, over the already-built matrix
+        matrix = result[1]
+        _, reduce_ms, _ = measure(lambda: matrix.student_percentages(batch=args.batch), args.repeat)
+        results.append({
+            'implementation': name,
+            'ms': ms,
+            'reduce_ms': reduce_ms,
+            'peak_mb': peak,
+            'matrix_bytes': len(matrix.data),
+            'speedup': round(baseline_ms / ms, 2) if ms else None
+        })
+
+    print(json.dumps({
+        'benchmark': 'attendance_matrix',
+        'config': {'students': args.students, 'days': args.days, 'records': len(records), 'batch': args.batch},
+        'results': results
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CSV student import against a local fake PostgREST
+Usage: python benchmarks/csv_import.py [--rows 10000] [--chunk-size 500]
+
+Writes a generated CSV to a temporary file, imports it twice through
+student_import.import_students (first run inserts, second run updates
+every row), and reports wall time and upstream requests as JSON. The fake
+runs in a separate process, so peak_mb (the tracemalloc peak of a third,
+traced run) is the importer's own memory: one chunk plus the roll numbers
+seen so far.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import fake_postgrest
+import requests
+from supabase_config import SupabaseClient
+from student_import import import_students
+
+
+def start_fake(latency_ms):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, 'fake_postgrest.py'), '--port', str(port),
+         '--students', '0', '--days', '0', '--latency-ms', str(latency_ms)],
+        stdout=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'{url}/rest/v1/students?limit=1', timeout=1)
+            return process, url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('fake_postgrest.py did not start within 30s')
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        f.write('roll_number,first_name,last_name,email,phone,batch,course,status\n')
+        for i in range(rows):
+            f.write(f'IMP{i:07d},First{i},Last{i},import{i}@example.com,9{i:09d},'
+                    f'Import College,{fake_postgrest.COURSES[i % len(fake_postgrest.COURSES)]},active\n')
+
+
+def run(client, calls, path, chunk_size, trace=False):
+    calls_before = len(calls)
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, newline='') as f:
+        report = import_students(client, f, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - start
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return round(peak / (1024 * 1024), 2)
+    return {
+        'seconds': round(elapsed, 3),
+        'rows_per_second': int(report.rows / elapsed) if elapsed else None,
+        'imported': report.imported,
+        'failed': report.failed,
+        'upstream_calls': len(calls) - calls_before
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=1.0,
+                        help='simulated network round trip per PostgREST call')
+    args = parser.parse_args()
+
+    process, url = start_fake(args.latency_ms)
+    client = SupabaseClient(url, 'benchmark-key')
+    calls = []
+    client.add_listener(lambda *args: calls.append(args[2]))
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_csv(path, args.rows)
+        size = os.path.getsize(path)
+        results = {'insert': run(client, calls, path, args.chunk_size),
+                   'update': run(client, calls, path, args.chunk_size)}
+        # Separate pass: tracing slows everything down, so it is kept out of the timings
+        peak_mb = run(client, calls, path, args.chunk_size, trace=True)
+    finally:
+        os.unlink(path)
+        process.terminate()
+        process.wait(timeout=10)
+
+    print(json.dumps({
+        'benchmark': 'csv_import',
+        'config': {'rows': args.rows, 'csv_mb': round(size / (1024 * 1024), 2),
+                   'chunk_size': args.chunk_size, 'latency_ms': args.latency_ms},
+        'peak_mb': peak_mb,
+        'results': results
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
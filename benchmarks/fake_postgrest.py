@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for the Supabase PostgREST API, for benchmarks
+Usage: python benchmarks/fake_postgrest.py [--port 54321] [--students 1000] [--days 90]
+
+Implements the subset of PostgREST that app.py uses: filters (eq, neq, gt,
+gte, lt, lte, in, is, like, ilike, not., or/and groups), select with
+embedded resources (students!inner(...) plus filters on them), order,
+limit/offset, count=exact, upserts with on_conflict, PATCH, DELETE, and the
+RPC functions from supabase_schema.sql. Attendance is indexed by date and by
+student, and the daily rollup is maintained on every write the way the
+database triggers do, so the fake stays cheap next to the app under test.
+"""
+import argparse
+import bisect
+import json
+import random
+import re
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+from werkzeug.security import generate_password_hash
+
+MAX_ROWS = 1000
+
+BATCHES = ('KL University', 'Diet College')
+COURSES = ('Computer Science', 'Electronics', 'Mechanical', 'Calibo Training')
+
+# Unique keys per table; the first one is the primary key
+UNIQUE_KEYS = {
+    'admins': (('id',), ('username',)),
+    'students': (('id',), ('roll_number',)),
+    'attendance': (('id',), ('student_id', 'attendance_date')),
+    'attendance_sync_batches': (('idempotency_key',),),
+}
+
+# Column DEFAULTs for rows inserted without them
+COLUMN_DEFAULTS = {
+    'students': {'status': 'active'},
+}
+
+# Generated (STORED) columns, recomputed on every insert and update
+GENERATED_COLUMNS = {
+    'students': {'batch_rank': lambda row: 0 if row.get('batch') == 'KL University' else 1},
+}
+
+# Embeddable relations: (table, embedded table) -> foreign key column on table
+EMBED_KEYS = {
+    ('attendance', 'students'): 'student_id',
+}
+
+RESERVED_PARAMS = ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns')
+
+
+class FakeDatabase:
+    """Tables as lists of dicts, plus the indexes the hot queries need"""
+
+    def __init__(self, max_rows=MAX_ROWS):
+        self.max_rows = max_rows
+        self.lock = threading.RLock()
+        self.tables = {name: [] for name in UNIQUE_KEYS}
+        self.unique = {name: {key: {} for key in keys} for name, keys in UNIQUE_KEYS.items()}
+        self.by_date = {}
+        self.dates = []
+        self.by_student = {}
+        self.rollup = {}
+        self.calls = 0
+        self.bytes_sent = 0
+
+    # ----- storage -----
+
+    def table(self, name):
+        if name not in self.tables:
+            self.tables[name] = []
+            self.unique[name] = {}
+        return self.tables[name]
+
+    def _key(self, row, columns):
+        return tuple(str(row.get(column)) for column in columns)
+
+    def find_conflict(self, name, row, columns=None):
+        keys = [tuple(columns)] if columns else list(self.unique[name])
+        for key in keys:
+            index = self.unique[name].get(key)
+            if index is not None:
+                existing = index.get(self._key(row, key))
+                if existing is not None:
+                    return existing
+            elif columns:
+                key_value = self._key(row, key)
+                for existing in self.tables[name]:
+                    if self._key(existing, key) == key_value:
+                        return existing
+        return None
+
+    def insert(self, name, row):
+        row = dict(row)
+        if name in ('admins', 'students', 'attendance'):
+            row.setdefault('id', str(uuid.uuid4()))
+        now = datetime.now().isoformat()
+        if name == 'attendance':
+            # trg_attendance_marked_at overrides any client value
+            row['marked_at'] = datetime.now(timezone.utc).isoformat()
+        row.setdefault('created_at', now)
+        for column, value in COLUMN_DEFAULTS.get(name, {}).items():
+            row.setdefault(column, value)
+        self._generate(name, row)
+        self.table(name).append(row)
+        for key, index in self.unique[name].items():
+            index[self._key(row, key)] = row
+        if name == 'attendance':
+            self._index_attendance(row, 1)
+        return row
+
+    def update(self, name, row, changes):
+        if name == 'attendance':
+            self._index_attendance(row, -1)
+        for key, index in self.unique[name].items():
+            index.pop(self._key(row, key), None)
+        row.update(changes)
+        if name == 'attendance':
+            row['marked_at'] = datetime.now(timezone.utc).isoformat()
+        self._generate(name, row)
+        for key, index in self.unique[name].items():
+            index[self._key(row, key)] = row
+        if name == 'attendance':
+            self._index_attendance(row, 1)
+        return row
+
+    def _generate(self, name, row):
+        for column, compute in GENERATED_COLUMNS.get(name, {}).items():
+            row[column] = compute(row)
+
+    def delete(self, name, rows):
+        doomed = set(id(row) for row in rows)
+        self.tables[name][:] = [row for row in self.tables[name] if id(row) not in doomed]
+        for row in rows:
+            for key, index in self.unique[name].items():
+                index.pop(self._key(row, key), None)
+            if name == 'attendance':
+                self._index_attendance(row, -1)
+
+    def _index_attendance(self, row, sign):
+        day = row['attendance_date']
+        student_id = row['student_id']
+        if sign > 0:
+            if day not in self.by_date:
+                self.by_date[day] = {}
+                bisect.insort(self.dates, day)
+            self.by_date[day][student_id] = row
+            self.by_student.setdefault(student_id, {})[day] = row
+        else:
+            self.by_date.get(day, {}).pop(student_id, None)
+            self.by_student.get(student_id, {}).pop(day, None)
+        # Same bookkeeping as the attendance_rollup_trigger
+        student = self.unique['students'][('id',)].get((str(student_id),))
+        if student is not None:
+            counts = self.rollup.setdefault((day, student['batch'], student['course']), [0, 0, 0])
+            counts[0 if row['status'] == 'present' else 1] += sign
+            counts[2] += sign
+
+    # ----- reads -----
+
+    def candidates(self, name, filters):
+        # Narrow attendance scans with the date/student indexes when an eq filter allows it
+        if name == 'attendance':
+            for column, expr in filters:
+                if expr.startswith('eq.'):
+                    value = expr[3:]
+                    if column == 'attendance_date':
+                        return list(self.by_date.get(value, {}).values())
+                    if column == 'student_id':
+                        return list(self.by_student.get(value, {}).values())
+        return self.table(name)
+
+    def dates_between(self, start, end):
+        lo = bisect.bisect_left(self.dates, start) if start else 0
+        hi = bisect.bisect_right(self.dates, end) if end else len(self.dates)
+        return self.dates[lo:hi]
+
+
+# ----- filter evaluation -----
+
+def _split_top_level(text):
+    parts, depth, current, quoted = [], 0, '', False
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        if ch == ',' and depth == 0 and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += ch
+    parts.append(current)
+    return parts
+
+
+def _compare(op, value, target):
+    if op == 'is':
+        if target == 'null':
+            return value is None
+        return str(value).lower() == target
+    if value is None:
+        # NULL compares as unknown, which PostgREST filters out
+        return False
+    value = str(value).lower() if isinstance(value, bool) else str(value)
+    if op == 'eq':
+        return value == target
+    if op == 'neq':
+        return value != target
+    if op == 'gt':
+        return value > target
+    if op == 'gte':
+        return value >= target
+    if op == 'lt':
+        return value < target
+    if op == 'lte':
+        return value <= target
+    if op == 'in':
+        return value in [item.strip('"') for item in _split_top_level(target.strip('()'))]
+    if op in ('like', 'ilike'):
+        pattern = re.escape(target).replace(r'\*', '.*').replace('%', '.*')
+        return re.fullmatch(pattern, value, re.IGNORECASE if op == 'ilike' else 0) is not None
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def matches(row, column, expr):
+    if column in ('or', 'and'):
+        results = []
+        for part in _split_top_level(expr[1:-1]):
+            if part.startswith(('or(', 'and(')):
+                kind, _, rest = part.partition('(')
+                results.append(matches(row, kind, '(' + rest))
+            else:
+                sub_column, _, sub_expr = part.partition('.')
+                results.append(matches(row, sub_column, sub_expr))
+        return any(results) if column == 'or' else all(results)
+    negate = expr.startswith('not.')
+    if negate:
+        expr = expr[4:]
+    op, _, target = expr.partition('.')
+    if op != 'in':
+        target = target.strip('"')
+    result = _compare(op, row.get(column), target)
+    return not result if negate else result
+
+
+def parse_select(columns):
+    """'id,students!inner(batch)' -> (['id'], [('students', True, 'batch')])"""
+    plain, embeds = [], []
+    for part in _split_top_level(columns or '*'):
+        part = part.strip()
+        embed = re.fullmatch(r'(\w+)(?:!(\w+))?\((.*)\)', part)
+        if embed:
+            embeds.append((embed.group(1), embed.group(2) == 'inner', embed.group(3)))
+        elif part:
+            plain.append(part)
+    return plain, embeds
+
+
+def _related(db, name, row, resource):
+    key = EMBED_KEYS.get((name, resource))
+    if key is None:
+        raise ValueError(f"Could not find a relationship between '{name}' and '{resource}'")
+    return db.unique[resource][('id',)].get((str(row.get(key)),))
+
+
+def select_rows(db, name, params, source=None):
+    filters, embed_filters = [], {}
+    for key, value in params:
+        if key in RESERVED_PARAMS:
+            continue
+        if '.' in key:
+            # students.batch=eq.X filters the embedded resource
+            resource, _, column = key.partition('.')
+            embed_filters.setdefault(resource, []).append((column, value))
+        else:
+            filters.append((key, value))
+    options = dict((k, v) for k, v in params if k in RESERVED_PARAMS)
+    # Only !inner embeds drop parent rows (a plain embed would just come back null)
+    inner = [resource for resource, is_inner, _ in parse_select(options.get('select'))[1] if is_inner]
+
+    if source is None:
+        source = db.candidates(name, filters)
+    rows = []
+    for row in source:
+        if not all(matches(row, k, v) for k, v in filters):
+            continue
+        related = {resource: _related(db, name, row, resource) for resource in inner}
+        if all(related[resource] is not None and
+               all(matches(related[resource], k, v) for k, v in embed_filters.get(resource, ()))
+               for resource in inner):
+            rows.append(row)
+    if 'order' in options:
+        for part in reversed(options['order'].split(',')):
+            column, _, direction = part.partition('.')
+            descending = direction.startswith('desc')
+            rows.sort(key=lambda row: (row.get(column) is None, str(row.get(column))), reverse=descending)
+    return rows, options
+
+
+def project(db, name, rows, columns):
+    plain, embeds = parse_select(columns)
+    if plain == ['*'] and not embeds:
+        return rows
+    result = []
+    for row in rows:
+        item = dict(row) if '*' in plain else {column: row.get(column) for column in plain}
+        for resource, _, embed_columns in embeds:
+            # An empty embed (students!inner()) only filters
+            if embed_columns.strip():
+                related = _related(db, name, row, resource)
+                item[resource] = project(db, resource, [related], embed_columns)[0] if related else None
+        result.append(item)
+    return result
+
+
+# ----- RPC functions (mirrors supabase_schema.sql) -----
+
+def _joined(db, params):
+    students = db.unique['students'][('id',)]
+    for day in db.dates_between(params.get('p_start'), params.get('p_end')):
+        for row in db.by_date[day].values():
+            student = students.get((str(row['student_id']),))
+            if student is None:
+                continue
+            if params.get('p_batch') and student['batch'] != params['p_batch']:
+                continue
+            if params.get('p_course') and student['course'] != params['p_course']:
+                continue
+            yield row, student
+
+
+def _group_counts(db, params, key, extra):
+    groups = {}
+    for row, student in _joined(db, params):
+        group_key = key(row, student)
+        entry = groups.get(group_key)
+        if entry is None:
+            entry = groups[group_key] = dict(extra(row, student), present=0, absent=0, total=0)
+        entry[row['status']] += 1
+        entry['total'] += 1
+    return [groups[k] for k in sorted(groups)]
+
+
+def _student_rows(db, student_id, start=None, end=None):
+    for day, row in db.by_student.get(student_id, {}).items():
+        if (start is None or day >= start) and (end is None or day <= end):
+            yield row
+
+
+def _summary(rows):
+    present = sum(1 for row in rows if row['status'] == 'present')
+    return {'present': present, 'absent': len(rows) - present, 'total': len(rows)}
+
+
+def rpc_student_attendance_windows(db, params):
+    as_of = date.fromisoformat(params['p_as_of'])
+    result = []
+    for days in params.get('p_days') or [7, 30, 90]:
+        start = (as_of - timedelta(days=days - 1)).isoformat()
+        rows = list(_student_rows(db, params['p_student_id'], start, params['p_as_of']))
+        result.append(dict(_summary(rows), days=days))
+    return result
+
+
+def rpc_attendance_status_strings(db, params):
+    days = []
+    current, last = date.fromisoformat(params['p_start']), date.fromisoformat(params['p_end'])
+    while current <= last:
+        days.append(current.isoformat())
+        current += timedelta(days=1)
+    codes = {'present': '1', 'absent': '2'}
+    result = []
+    for student in db.tables['students']:
+        if student.get('status') != 'active':
+            continue
+        if params.get('p_batch') and student['batch'] != params['p_batch']:
+            continue
+        if params.get('p_course') and student['course'] != params['p_course']:
+            continue
+        marks = db.by_student.get(student['id'], {})
+        result.append({
+            'student_id': student['id'],
+            'statuses': ''.join(codes[marks[day]['status']] if day in marks else '0' for day in days)
+        })
+    return sorted(result, key=lambda row: row['student_id'])
+
+
+def rpc_attendance_rollup_by_date(db, params):
+    totals = {}
+    for (day, batch, course), counts in db.rollup.items():
+        if not (params['p_start'] <= day <= params['p_end']):
+            continue
+        if params.get('p_batch') and batch != params['p_batch']:
+            continue
+        if params.get('p_course') and course != params['p_course']:
+            continue
+        entry = totals.setdefault(day, [0, 0, 0])
+        for i in range(3):
+            entry[i] += counts[i]
+    return [
+        {'attendance_date': day, 'present': c[0], 'absent': c[1], 'total': c[2]}
+        for day, c in sorted(totals.items()) if c[2] > 0
+    ]
+
+
+def rpc_refresh_attendance_daily_rollup(db, params):
+    db.rollup = {}
+    for row in list(db.tables['attendance']):
+        db._index_attendance(row, 1)
+    return len(db.rollup)
+
+
+RPC_FUNCTIONS = {
+    'attendance_counts_by_date': lambda db, p: _group_counts(
+        db, p, lambda a, s: a['attendance_date'], lambda a, s: {'attendance_date': a['attendance_date']}),
+    'attendance_counts_by_batch': lambda db, p: _group_counts(
+        db, p, lambda a, s: s['batch'], lambda a, s: {'batch': s['batch']}),
+    'attendance_counts_by_course': lambda db, p: _group_counts(
+        db, p, lambda a, s: s['course'], lambda a, s: {'course': s['course']}),
+    'attendance_counts_by_student': lambda db, p: _group_counts(
+        db, p, lambda a, s: (s['batch'], s['roll_number']),
+        lambda a, s: {key: s[key] for key in ('roll_number', 'first_name', 'last_name', 'batch', 'course')}
+        | {'student_id': s['id']}),
+    'student_attendance_summary': lambda db, p: [_summary(list(
+        _student_rows(db, p['p_student_id'], p.get('p_start'), p.get('p_end'))))],
+    'student_attendance_windows': rpc_student_attendance_windows,
+    'attendance_rollup_by_date': rpc_attendance_rollup_by_date,
+    'attendance_status_strings': rpc_attendance_status_strings,
+    'refresh_attendance_daily_rollup': rpc_refresh_attendance_daily_rollup,
+}
+
+
+# ----- HTTP layer -----
+
+class PostgRESTHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without TCP_NODELAY keep-alive
+    # clients stall ~40ms per call on delayed ACKs
+    disable_nagle_algorithm = True
+    db = None
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        # Count before writing so a client that has the response also sees the count
+        with self.db.lock:
+            self.db.bytes_sent += len(data)
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def _route(self):
+        url = urlparse(self.path)
+        resource = url.path.split('/rest/v1/', 1)[-1]
+        return resource, parse_qsl(url.query, keep_blank_values=True)
+
+    def _prefer(self, token):
+        return token in (self.headers.get('Prefer') or '')
+
+    def _handle(self, method):
+        if self.latency:
+            threading.Event().wait(self.latency)
+        resource, params = self._route()
+        body = self._body() if method in ('POST', 'PATCH') else None
+        db = self.db
+        with db.lock:
+            db.calls += 1
+            try:
+                if resource.startswith('rpc/'):
+                    function = RPC_FUNCTIONS.get(resource[4:])
+                    if function is None:
+                        return self._send(404, {'message': f'Unknown function {resource}'})
+                    result = function(db, body or {})
+                    if isinstance(result, list):
+                        # Set-returning functions accept the same filters and paging as tables
+                        return self._get(resource, params, source=result)
+                    return self._send(200, result)
+                if method == 'GET':
+                    return self._get(resource, params)
+                if method == 'POST':
+                    return self._post(resource, params, body)
+                if method == 'PATCH':
+                    rows, _ = select_rows(db, resource, params)
+                    updated = [db.update(resource, row, body) for row in rows]
+                    return self._send(200, updated)
+                if method == 'DELETE':
+                    rows, _ = select_rows(db, resource, params)
+                    db.delete(resource, rows)
+                    return self._send(200, rows)
+            except (KeyError, ValueError) as e:
+                return self._send(400, {'message': str(e)})
+
+    def _get(self, resource, params, source=None):
+        rows, options = select_rows(self.db, resource, params, source)
+        total = len(rows)
+        offset = int(options.get('offset', 0))
+        limit = min(int(options['limit']), self.db.max_rows) if 'limit' in options else self.db.max_rows
+        page = project(self.db, resource, rows[offset:offset + limit], options.get('select'))
+        headers = {}
+        if self._prefer('count=exact'):
+            headers['Content-Range'] = f'{offset}-{offset + len(page) - 1}/{total}' if page else f'*/{total}'
+        return self._send(200, page, headers)
+
+    def _post(self, resource, params, body):
+        rows = body if isinstance(body, list) else [body]
+        options = dict(params)
+        conflict_columns = options['on_conflict'].split(',') if 'on_conflict' in options else None
+        merge = self._prefer('resolution=merge-duplicates')
+        ignore = self._prefer('resolution=ignore-duplicates')
+        # Validate first so a failing batch writes nothing, like a single INSERT statement
+        if merge and conflict_columns:
+            keys = [tuple(row.get(column) for column in conflict_columns) for row in rows]
+            if len(set(keys)) < len(keys):
+                return self._send(500, {'code': '21000', 'message':
+                                        'ON CONFLICT DO UPDATE command cannot affect row a second time'})
+        for row in rows:
+            if not (merge or ignore) and self.db.find_conflict(resource, row) is not None:
+                return self._send(409, {'message': 'duplicate key value violates unique constraint'})
+        result = []
+        for row in rows:
+            existing = self.db.find_conflict(resource, row, conflict_columns) if (merge or ignore) else None
+            if existing is None:
+                result.append(self.db.insert(resource, row))
+            elif merge:
+                result.append(self.db.update(resource, existing, row))
+        return self._send(201, result)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+def seed(db, students=1000, days=90, end=None, seed_value=42, admin_password='admin123'):
+    """Generate students x days of attendance ending at `end` (default: today)"""
+    rng = random.Random(seed_value)
+    end = end or date.today()
+    with db.lock:
+        db.insert('admins', {
+            'username': 'admin',
+            'password_hash': generate_password_hash(admin_password),
+            'email': 'admin@example.com'
+        })
+        roster = []
+        for i in range(students):
+            batch = BATCHES[i % len(BATCHES)]
+            roster.append(db.insert('students', {
+                'roll_number': f'{22000 + i % len(BATCHES)}{i:06d}',
+                'first_name': f'First{i}',
+                'last_name': f'Last{i}',
+                'email': f'student{i}@example.com',
+                'phone': f'98765{i:05d}',
+                'batch': batch,
+                'course': COURSES[i % len(COURSES)],
+                'status': 'active' if i % 50 else 'inactive'
+            }))
+        for offset in range(days - 1, -1, -1):
+            day = (end - timedelta(days=offset)).isoformat()
+            marked_at = f'{day}T09:00:00+00:00'
+            for student in roster:
+                # Seeded history keeps its own mark time instead of the trigger's
+                db.insert('attendance', {
+                    'student_id': student['id'],
+                    'attendance_date': day,
+                    'status': 'absent' if rng.random() < 0.15 else 'present',
+                    'remarks': ''
+                })['marked_at'] = marked_at
+    return db
+
+
+def serve(db, host='127.0.0.1', port=0, latency_ms=0):
+    handler = type('Handler', (PostgRESTHandler,), {'db': db, 'latency': latency_ms / 1000.0})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    db = seed(FakeDatabase(), args.students, args.days)
+    server = serve(db, args.host, args.port, args.latency_ms)
+    print(f"Fake PostgREST on http://{args.host}:{server.server_port} "
+          f"({args.students} students x {args.days} days)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request auth overhead for each session backend
+Usage: python benchmarks/session_backends.py [--requests 2000]
+
+Each backend gets a minimal Flask app with a require_auth-style route.
+A logged-in test client then hits it repeatedly, so the timings isolate
+session load/save cost from Supabase. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, session
+from session_store import SESSION_BACKENDS, init_session
+
+
+def build_app(backend, workdir):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'benchmark-secret'
+    app.config['SESSION_BACKEND'] = backend
+    app.config['SESSION_PERMANENT'] = True
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
+    app.config['SESSION_SQLITE_PATH'] = os.path.join(workdir, 'sessions.sqlite3')
+    app.config['SESSION_FILE_DIR'] = os.path.join(workdir, 'flask_session')
+    init_session(app)
+
+    @app.route('/login', methods=['POST'])
+    def login():
+        session.permanent = True
+        session['admin_id'] = 'benchmark-admin'
+        session['username'] = 'admin'
+        return jsonify({'success': True})
+
+    @app.route('/check')
+    def check():
+        if 'admin_id' not in session:
+            return jsonify({'success': False}), 401
+        return jsonify({'success': True})
+
+    return app
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_backend(backend, requests_count, workdir):
+    app = build_app(backend, workdir)
+    client = app.test_client()
+    client.post('/login')
+
+    # Warm up
+    for _ in range(20):
+        client.get('/check')
+
+    samples = []
+    for _ in range(requests_count):
+        start = time.perf_counter()
+        response = client.get('/check')
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{backend}: request was not authenticated")
+
+    return {
+        'backend': backend,
+        'requests': requests_count,
+        'mean_ms': round(sum(samples) / len(samples), 4),
+        'p50_ms': round(percentile(samples, 50), 4),
+        'p95_ms': round(percentile(samples, 95), 4),
+        'p99_ms': round(percentile(samples, 99), 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--backends', default=','.join(SESSION_BACKENDS))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='session-bench-')
+    try:
+        results = [run_backend(backend, args.requests, workdir) for backend in args.backends.split(',')]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({'benchmark': 'session_backends', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,405 @@
+"""
+In-process caches for the Student Attendance Tracker
+
+ResponseCache and RosterCache optionally sit in front of a shared store
+(shared_cache.py) so workers reuse each other's entries and see each
+other's invalidations.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, timedelta
+from supabase_config import DEFAULT_PAGE_SIZE
+
+ROSTER_CACHE_TTL = float(os.environ.get('ROSTER_CACHE_TTL', 300))
+ROSTER_CACHE_SIZE = int(os.environ.get('ROSTER_CACHE_SIZE', 64))
+# Columns of a cached student: the API's student object, not select('*')
+ROSTER_COLUMNS = 'id,roll_number,first_name,last_name,email,phone,batch,course,status,created_at,updated_at'
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 300))
+RESPONSE_CACHE_CLOSED_TTL = float(os.environ.get('RESPONSE_CACHE_CLOSED_TTL', 24 * 60 * 60))
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+# Report ranges at least this long are stamped by month rather than by day,
+# and ranges past STAMP_MONTHS_LIMIT days (e.g. open-ended history) by "any date"
+STAMP_DAYS_LIMIT = 62
+STAMP_MONTHS_LIMIT = 5 * 366
+
+
+def shared_key(kind, key):
+    return f"{kind}:{hashlib.sha1(repr(key).encode('utf-8')).hexdigest()}"
+
+
+def _days(start, end):
+    day, last = date.fromisoformat(start), date.fromisoformat(end)
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+def report_stamps(start=None, end=None, batch=None):
+    """Version stamps a cached report depends on (see shared_cache.py).
+
+    A report filtered to one batch depends on "<unit>|<batch>" and on
+    "<unit>|*" (writes whose batches are unknown); others on "<unit>".
+    """
+    if start is None:
+        return ['reports']
+    span = (date.fromisoformat(end) - date.fromisoformat(start)).days
+    if span < STAMP_DAYS_LIMIT:
+        units = [f'date:{day}' for day in _days(start, end)]
+    elif span < STAMP_MONTHS_LIMIT:
+        units = sorted({f'month:{day[:7]}' for day in _days(start, end)})
+    else:
+        units = ['date:any']
+    if batch is None:
+        return ['reports'] + units
+    return ['reports'] + [f'{unit}|{batch}' for unit in units] + [f'{unit}|*' for unit in units]
+
+
+def write_stamps(dates, batches=None):
+    """Stamps bumped by an attendance write to these dates (and batches, if known)"""
+    units = ['date:any']
+    for day in dates:
+        units.extend((f'date:{day}', f'month:{day[:7]}'))
+    stamps = []
+    for unit in units:
+        stamps.append(unit)
+        if batches is None:
+            stamps.append(f'{unit}|*')
+        else:
+            stamps.extend(f'{unit}|{batch}' for batch in batches)
+    return stamps
+
+
+class CacheEntry:
+    __slots__ = ('value', 'etag', 'expires_at')
+
+    def __init__(self, value, etag, expires_at):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+
+    def is_fresh(self):
+        return time.monotonic() < self.expires_at
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL.
+
+    Stale entries are kept (until evicted) so callers can revalidate them
+    with their ETag instead of re-downloading.
+    """
+
+    def __init__(self, maxsize=128, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        if entry is not None and entry.is_fresh():
+            return entry.value
+        return None
+
+    def set(self, key, value, etag=None, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = CacheEntry(value, etag, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def touch(self, key, ttl=None):
+        # Extend the lifetime of a revalidated entry
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class CachedResponse:
+    __slots__ = ('body', 'mimetype', 'etag', 'start', 'end', 'batch')
+
+    def __init__(self, body, mimetype, start=None, end=None, batch=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:40]
+        self.start = start
+        self.end = end
+        self.batch = batch
+
+    def covers(self, dates, batches=None):
+        if self.start is None:
+            return False
+        if batches is not None and self.batch is not None and self.batch not in batches:
+            return False
+        return any(self.start <= date <= self.end for date in dates)
+
+
+class ResponseCache:
+    """Rendered report responses keyed by request and tagged with the dates they cover.
+
+    Writes call invalidate_dates() with the attendance dates (and batches)
+    they touched; entries without a date range only go away via
+    invalidate() or the TTL. With a shared store, misses fall through to it
+    and invalidations reach every worker.
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, closed_ttl=RESPONSE_CACHE_CLOSED_TTL,
+                 store=None):
+        self.closed_ttl = closed_ttl
+        self.store = store
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+        # Bumped on every invalidation so a response computed before it is not stored after it
+        self.generation = 0
+        if store is not None:
+            store.subscribe(self._on_invalidation)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def snapshot(self):
+        """Take before computing a response and pass to set()"""
+        return self.generation, self.store.snapshot() if self.store is not None else None
+
+    def get(self, key):
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._count('hits')
+            return cached
+
+        if self.store is not None:
+            generation = self.generation
+            found = self.store.load(shared_key('report', key))
+            if found is not None:
+                meta, body = found
+                cached = CachedResponse(body, meta['mimetype'], meta['start'], meta['end'], meta['batch'])
+                with self._lock:
+                    keep = generation == self.generation
+                if keep:
+                    self._cache.set(key, cached, ttl=max(meta['expires_at'] - time.time(), 0))
+                self._count('shared_hits')
+                return cached
+
+        self._count('misses')
+        return None
+
+    def set(self, key, body, mimetype, start=None, end=None, batch=None, closed=False, snapshot=None):
+        cached = CachedResponse(body, mimetype, start, end, batch)
+        ttl = self.closed_ttl if closed else self._cache.ttl
+        with self._lock:
+            if snapshot is not None and snapshot[0] != self.generation:
+                return cached
+        self._cache.set(key, cached, ttl=ttl)
+        if self.store is not None and snapshot is not None:
+            meta = {'mimetype': mimetype, 'start': start, 'end': end, 'batch': batch,
+                    'expires_at': time.time() + ttl}
+            self.store.save(shared_key('report', key), snapshot[1], report_stamps(start, end, batch), meta, body, ttl)
+        return cached
+
+    def invalidate_dates(self, dates, batches=None):
+        """Drop responses covering these dates; batches=None means any batch"""
+        dates = [str(date) for date in dates]
+        batches = sorted(batches) if batches is not None else None
+        removed = self._drop(dates, batches)
+        if self.store is not None:
+            self.store.publish(write_stamps(dates, batches), {'cache': 'reports', 'dates': dates, 'batches': batches})
+        return removed
+
+    def invalidate(self):
+        removed = self._drop()
+        if self.store is not None:
+            self.store.publish(['reports'], {'cache': 'reports'})
+        return removed
+
+    def _drop(self, dates=None, batches=None):
+        with self._lock:
+            self.generation += 1
+        if dates is None:
+            removed = len(self._cache)
+            self._cache.invalidate()
+        else:
+            removed = 0
+            for key, entry in self._cache.items():
+                if entry.value.covers(dates, batches):
+                    self._cache.invalidate(key)
+                    removed += 1
+        self._count('invalidations', removed)
+        return removed
+
+    def _on_invalidation(self, event):
+        # Published by another worker's invalidate_dates()/invalidate()
+        if event.get('cache') == 'reports':
+            self._drop(event.get('dates'), event.get('batches'))
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        result['entries'] = len(self._cache)
+        return result
+
+
+class RosterCache:
+    """Shared cache of the students table, keyed by status/batch/course filter.
+
+    Cached lists are shared between requests and must be treated as read-only.
+    Call invalidate() after any write to the students table; with a shared
+    store that reaches every worker.
+    """
+
+    def __init__(self, client, maxsize=ROSTER_CACHE_SIZE, ttl=ROSTER_CACHE_TTL, revalidate=True, store=None,
+                 columns=ROSTER_COLUMNS):
+        self.client = client
+        self.columns = columns
+        self.revalidate = revalidate
+        self.store = store
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'revalidated': 0}
+        # Bumped on every invalidation so a roster fetched before it is not stored after it
+        self.generation = 0
+        if store is not None:
+            store.subscribe(self._on_invalidation)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _current(self, generation):
+        with self._lock:
+            return generation == self.generation
+
+    def get_students(self, batch=None, course=None, status='active'):
+        key = (status, batch, course)
+        entry = self._cache.get_entry(key)
+        if entry is not None and entry.is_fresh():
+            self._count('hits')
+            return entry.value
+
+        generation = self.generation
+        seq = None
+        if self.store is not None:
+            found = self.store.load(shared_key('roster', key))
+            if found is not None:
+                meta, payload = found
+                students = json.loads(payload)
+                if self._current(generation):
+                    self._cache.set(key, students, etag=meta['etag'], ttl=max(meta['expires_at'] - time.time(), 0))
+                self._count('shared_hits')
+                return students
+            seq = self.store.snapshot()
+
+        query = self.client.table('students').select(self.columns)
+        if status:
+            query = query.eq('status', status)
+        if batch:
+            query = query.eq('batch', batch)
+        if course:
+            query = query.eq('course', course)
+        query = query.order('batch').order('roll_number')
+
+        # Stale entry with an ETag: ask PostgREST whether it changed. The ETag
+        # only covers the first page, so a roster that needed more is refetched
+        if entry is not None and entry.etag and self.revalidate and len(entry.value) < DEFAULT_PAGE_SIZE:
+            query = query.if_none_match(entry.etag)
+
+        # Page through so rosters larger than PostgREST's row cap are complete
+        students = []
+        for page in query.iter_pages(page_size=DEFAULT_PAGE_SIZE):
+            students.extend(page)
+        if query.not_modified and entry is not None:
+            self._count('revalidated')
+            if self._current(generation):
+                self._cache.touch(key)
+            return entry.value
+
+        self._count('misses')
+        if not self._current(generation):
+            return students
+        self._cache.set(key, students, etag=query.etag)
+        if seq is not None:
+            meta = {'etag': query.etag, 'expires_at': time.time() + self._cache.ttl}
+            self.store.save(shared_key('roster', key), seq, ['roster'], meta,
+                            json.dumps(students).encode('utf-8'), self._cache.ttl)
+        return students
+
+    def get_students_by_ids(self, ids, columns=None, fetch=True):
+        """{id: student} for just these students (any status).
+
+        Served from a fresh cached full roster when there is one; otherwise
+        only the listed students (and columns) are fetched, in chunked in.()
+        requests, and nothing is cached (with fetch=False, returns None
+        instead). Ids that are not UUIDs are skipped.
+        """
+        wanted = set()
+        for student_id in ids:
+            try:
+                wanted.add(str(uuid.UUID(str(student_id))))
+            except ValueError:
+                continue
+        if not wanted:
+            return {}
+
+        for key in ((None, None, None), ('active', None, None)):
+            entry = self._cache.get_entry(key)
+            if entry is not None and entry.is_fresh():
+                found = {student['id']: student for student in entry.value if student['id'] in wanted}
+                # The active-only roster can't prove an id is missing (it may be inactive)
+                if key[0] is None or len(found) == len(wanted):
+                    self._count('hits')
+                    return found
+
+        if not fetch:
+            return None
+        self._count('misses')
+        query = self.client.table('students').select(columns or self.columns)
+        return {student['id']: student for student in query.stream_in('id', sorted(wanted))}
+
+    def invalidate(self):
+        self._drop()
+        if self.store is not None:
+            self.store.publish(['roster'], {'cache': 'roster'})
+
+    def _drop(self):
+        with self._lock:
+            self.generation += 1
+        self._cache.invalidate()
+
+    def _on_invalidation(self, event):
+        if event.get('cache') == 'roster':
+            self._drop()
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        result['entries'] = len(self._cache)
+        return result
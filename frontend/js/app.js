@@ -146,19 +146,16 @@ class AttendanceApp {
 
     async loadBatchesAndCourses() {
         try {
-            const studentsResponse = await this.api('/api/students');
-            const data = await studentsResponse.json();
-            
-            // Handle both array/wrapped response format
-            const students = Array.isArray(data) ? data : (data.students || []);
-
-            if (!Array.isArray(students)) {
-                 console.warn("Expected students array, got:", students);
+            // Distinct batches and courses, without downloading the roster
+            const statsResponse = await this.api('/api/students/stats');
+            const data = await statsResponse.json();
+            if (!data.success) {
+                 console.warn("Failed to load student stats:", data.error);
                  return;
             }
             
-            const batches = [...new Set(students.map(s => s.batch).filter(Boolean))];
-            const courses = [...new Set(students.map(s => s.course).filter(Boolean))];
+            const batches = (data.byBatch || []).map(b => b.batch).filter(Boolean);
+            const courses = (data.courses || []).filter(Boolean);
             
             // Update all batch selectors (courses removed as per user requirements)
             this.populateSelectOptions('attendance-batch', batches);
@@ -167,7 +164,7 @@ class AttendanceApp {
             this.populateSelectOptions('filter-batch', batches);
             
             // Store for global use
-            window.appData = { batches, courses, students };
+            window.appData = { batches, courses };
         } catch (error) {
             console.error('Failed to load batches and courses:', error);
         }
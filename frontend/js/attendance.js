@@ -3,12 +3,16 @@ class AttendanceManager {
     constructor() {
         this.students = [];
         this.attendanceData = {};
+        this.deltaState = null;
+        this.deltaTimer = null;
+        this.deltaInterval = 15000;
         this.init();
     }
 
     init() {
         this.bindEvents();
         this.setupDateDefaults();
+        this.setupOfflineSync();
     }
 
     bindEvents() {
@@ -132,6 +136,7 @@ class AttendanceManager {
 
             this.renderAttendanceTable(attendanceData, allMarked);
             this.updateSaveButtonState();
+            this.startDeltaPolling(date, batch, data.cursor);
 
         } catch (error) {
             console.error('Failed to load attendance:', error);
@@ -158,6 +163,70 @@ class AttendanceManager {
         }
     }
 
+    // Poll for attendance marked by other admins on the same date; only changed rows are sent
+    startDeltaPolling(date, batch, cursor) {
+        this.stopDeltaPolling();
+        this.deltaState = { date, batch, cursor: cursor || '' };
+        this.deltaTimer = setInterval(() => this.pollAttendanceChanges(), this.deltaInterval);
+    }
+
+    stopDeltaPolling() {
+        if (this.deltaTimer) {
+            clearInterval(this.deltaTimer);
+            this.deltaTimer = null;
+        }
+        this.deltaState = null;
+    }
+
+    async pollAttendanceChanges() {
+        const state = this.deltaState;
+        if (!state || document.hidden || !navigator.onLine || state.polling) {
+            return;
+        }
+        if (!document.getElementById('attendance-tbody')?.offsetParent) {
+            return;
+        }
+
+        state.polling = true;
+        try {
+            const params = new URLSearchParams({ date: state.date, since: state.cursor });
+            if (state.batch) params.append('batch', state.batch);
+            const response = await window.app.api(`/api/attendance/by-date?${params.toString()}`);
+            const data = await response.json();
+            if (!response.ok || !data.success || this.deltaState !== state) {
+                return;
+            }
+            this.applyAttendanceChanges(data.changes || []);
+            state.cursor = data.cursor || state.cursor;
+        } catch (error) {
+            console.warn('Attendance delta poll failed:', error);
+        } finally {
+            state.polling = false;
+        }
+    }
+
+    applyAttendanceChanges(changes) {
+        const tbody = document.getElementById('attendance-tbody');
+        let applied = 0;
+        changes.forEach(change => {
+            const row = tbody.querySelector(`tr[data-student-id="${change.student_id}"]`);
+            // Rows the admin is editing locally are left alone
+            if (!row || row.dataset.dirty || row.dataset.markedAt === change.marked_at) {
+                return;
+            }
+            const absentCheckbox = row.querySelector(`input[id="absent_${change.student_id}"]`);
+            const remarksInput = row.querySelector(`input[name="remarks_${change.student_id}"]`);
+            if (absentCheckbox) absentCheckbox.checked = change.status === 'absent';
+            if (remarksInput) remarksInput.value = change.remarks || '';
+            row.dataset.markedAt = change.marked_at || '';
+            applied++;
+        });
+        if (applied > 0) {
+            this.updateAttendanceSummary();
+            this.updateSelectAllState();
+        }
+    }
+
     renderAttendanceTable(attendanceData, readOnly = false) {
         const tbody = document.getElementById('attendance-tbody');
         const loadingSpinner = document.getElementById('loading-spinner');
@@ -190,7 +259,7 @@ class AttendanceManager {
             const isAbsent = status === 'absent';
 
             html += `
-                <tr data-student-id="${studentId}" class="student-row">
+                <tr data-student-id="${studentId}" data-marked-at="${student.marked_at || ''}" class="student-row">
                     <td><strong>${student.roll_number}</strong></td>
                     <td>${student.first_name} ${student.last_name}</td>
                     <td>
@@ -239,6 +308,7 @@ class AttendanceManager {
             checkbox.addEventListener('change', (e) => {
                 // Allow default checkbox behavior for multiple selections
                 // Don't prevent default or stop propagation
+                checkbox.closest('tr').dataset.dirty = '1';
                 this.updateSelectAllState();
                 this.updateAttendanceSummary();
                 this.updateSaveButtonState();
@@ -247,6 +317,12 @@ class AttendanceManager {
         });
         }
 
+        tbody.querySelectorAll('input[name^="remarks_"]').forEach(input => {
+            input.addEventListener('input', () => {
+                input.closest('tr').dataset.dirty = '1';
+            });
+        });
+
         // Update button states
         this.updateSelectAllState();
         
@@ -378,10 +454,8 @@ class AttendanceManager {
                 // If checkbox is checked = absent, otherwise = present
                 const status = absentCheckbox && absentCheckbox.checked ? 'absent' : 'present';
                 
-                const parsedId = parseInt(studentId);
-                
                 attendanceRecords.push({
-                    student_id: parsedId,
+                    student_id: studentId,
                     status: status,
                     remarks: remarksInput ? remarksInput.value.trim() : ''
                 });
@@ -396,10 +470,21 @@ class AttendanceManager {
             saveBtn.disabled = true;
             saveBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Saving...';
 
-            // Save attendance
-            const response = await window.app.api('/api/attendance/mark', {
+            // Save attendance through the sync endpoint; the service worker queues it if offline
+            const idempotencyKey = this.newIdempotencyKey();
+            // The last server cursor this page has seen; the service worker attaches it
+            // to batches it queues, so a late replay can't overwrite marks made since
+            const cursor = this.deltaState && this.deltaState.date === date ? this.deltaState.cursor : '';
+            const response = await window.app.api('/api/v1/attendance/sync', {
                 method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': idempotencyKey,
+                    'X-Attendance-Cursor': cursor || ''
+                },
                 body: JSON.stringify({
+                    version: 1,
+                    idempotency_key: idempotencyKey,
                     attendance_date: date,
                     attendance_records: attendanceRecords
                 })
@@ -407,7 +492,13 @@ class AttendanceManager {
 
             const result = await response.json();
 
-            if (response.ok && result.success) {
+            if (response.status === 202 && result.queued) {
+                window.app.showAlert(
+                    'You are offline. Attendance was saved on this device and will sync automatically.',
+                    'info',
+                    5000
+                );
+            } else if (response.ok && result.success) {
                 const presentCount = attendanceRecords.filter(r => r.status === 'present').length;
                 const absentCount = attendanceRecords.filter(r => r.status === 'absent').length;
                 
@@ -417,6 +508,14 @@ class AttendanceManager {
                     3000
                 );
                 
+                if (result.failed && result.failed.length > 0) {
+                    console.warn('Failed attendance records:', result.failed);
+                    window.app.showAlert(
+                        `${result.failed.length} record(s) could not be saved. Please retry.`,
+                        'warning'
+                    );
+                }
+                
                 // Refresh to show updated state
                 await this.loadStudentsForAttendance();
             } else {
@@ -436,6 +535,42 @@ class AttendanceManager {
         }
     }
 
+    newIdempotencyKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+
+    setupOfflineSync() {
+        if (!('serviceWorker' in navigator)) {
+            return;
+        }
+        const flush = () => {
+            navigator.serviceWorker.ready.then((registration) => {
+                if (registration.active) {
+                    registration.active.postMessage({ type: 'FLUSH_QUEUE' });
+                }
+            });
+        };
+        window.addEventListener('online', flush);
+        navigator.serviceWorker.addEventListener('message', (event) => {
+            if (event.data && event.data.type === 'SYNC_COMPLETE' && event.data.synced > 0) {
+                window.app.showAlert(`Synced ${event.data.synced} offline attendance batch(es)`, 'success', 3000);
+                if (event.data.skipped > 0) {
+                    window.app.showAlert(
+                        `${event.data.skipped} offline mark(s) were not applied: someone else marked those students since.`,
+                        'warning'
+                    );
+                }
+            }
+        });
+        // Drain anything left over from a previous session
+        if (navigator.onLine) {
+            flush();
+        }
+    }
+
     // New methods for selected students functionality
     getSelectedStudentIds() {
         const checkboxes = document.querySelectorAll('.student-checkbox:checked');
@@ -448,6 +583,7 @@ class AttendanceManager {
         
         checkboxes.forEach(checkbox => {
             checkbox.checked = checked;
+            checkbox.closest('tr').dataset.dirty = '1';
         });
         
         this.updateAttendanceSummary();
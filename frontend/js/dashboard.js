@@ -26,12 +26,8 @@ class DashboardManager {
         try {
             window.app.showSpinner();
             
-            // Load multiple data sources in parallel
-            const [studentStats, todayAttendance, trends] = await Promise.all([
-                this.loadStudentStats(),
-                this.loadTodayAttendance(),
-                this.loadAttendanceTrends()
-            ]);
+            // One request; the server fans the underlying queries out in parallel
+            const { students: studentStats, attendance: todayAttendance, trends } = await this.loadDashboard();
 
             this.updateStatsCards(studentStats, todayAttendance);
             this.updateAttendanceChart(trends);
@@ -45,6 +41,24 @@ class DashboardManager {
         }
     }
 
+    async loadDashboard() {
+        const today = new Date().toISOString().split('T')[0];
+        const response = await window.app.api(`/api/dashboard?date=${today}&days=7`);
+        const data = await response.json();
+        if (data.timing) {
+            console.log('Dashboard timing (ms):', data.timing);
+        }
+        // A failed section still comes back (as zeros) with success false; a failed request has no sections
+        if (!response.ok || !data.students || !data.attendance || !data.trends) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        if (!data.success) {
+            console.error('Dashboard section errors:', data.errors);
+            window.app.showAlert(`Some dashboard data failed to load: ${Object.keys(data.errors || {}).join(', ')}`, 'warning');
+        }
+        return data;
+    }
+
     async loadStudentStats() {
         const response = await window.app.api('/api/students/stats/overview');
         return await response.json();
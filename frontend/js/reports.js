@@ -71,7 +71,7 @@ class ReportsManager {
     async populateDropdowns() {
         try {
             // Load students for student report dropdown
-            const response = await window.app.api('/api/students');
+            const response = await window.app.api('/api/students?fields=id,roll_number,first_name,last_name');
             const data = await response.json();
             
             if (!data.success) {
@@ -293,6 +293,9 @@ class ReportsManager {
             const reportData = await response.json();
             console.log('Report data received:', reportData);
 
+            // Remember the query so further pages can be appended
+            this.studentHistory = { studentId, params, nextCursor: reportData.next_cursor };
+
             this.renderStudentReport(reportData);
             window.app.showAlert('Student report generated successfully!', 'success', 3000);
 
@@ -416,6 +419,44 @@ class ReportsManager {
         container.innerHTML = html;
     }
 
+    async loadMoreStudentHistory() {
+        const history = this.studentHistory;
+        if (!history || !history.nextCursor) return;
+
+        try {
+            const params = new URLSearchParams(history.params);
+            params.set('cursor', history.nextCursor);
+
+            const response = await window.app.api(`/api/reports/student/${history.studentId}/history?${params}`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            }
+
+            const data = await response.json();
+            history.nextCursor = data.next_cursor;
+
+            const tbody = document.getElementById('student-history-tbody');
+            if (tbody) {
+                tbody.insertAdjacentHTML('beforeend', data.attendance.map(record => this.renderHistoryRow(record)).join(''));
+            }
+            document.getElementById('student-history-more')?.classList.toggle('d-none', !data.has_more);
+        } catch (error) {
+            console.error('Failed to load more history:', error);
+            window.app.showAlert('Failed to load more records: ' + error.message, 'danger');
+        }
+    }
+
+    renderHistoryRow(record) {
+        return `
+            <tr>
+                <td>${window.app.formatDate(record.attendance_date)}</td>
+                <td>${this.getStatusBadge(record.status)}</td>
+                <td>${record.remarks || ''}</td>
+                <td>${window.app.formatDateTime(record.marked_at)}</td>
+            </tr>
+        `;
+    }
+
     renderStudentReport(data) {
         const container = document.getElementById('student-report-results');
         
@@ -426,6 +467,9 @@ class ReportsManager {
 
         const student = data.student;
         const summary = data.summary;
+        const windows = (data.windows || []).map(w =>
+            `<span class="badge bg-${this.getAttendanceClass(w.percentage)} me-1">Last ${w.days} days: ${w.percentage}%</span>`
+        ).join('');
 
         let html = `
             <div class="row mb-4">
@@ -446,7 +490,8 @@ class ReportsManager {
                             <p class="mb-1">Total Days: ${summary.total_days}</p>
                             <p class="mb-1">Present: <span class="text-success">${summary.present_days}</span></p>
                             <p class="mb-1">Absent: <span class="text-danger">${summary.absent_days}</span></p>
-                            <p class="mb-0">Percentage: <span class="badge bg-${this.getAttendanceClass(summary.attendance_percentage)}">${summary.attendance_percentage}%</span></p>
+                            <p class="mb-1">Percentage: <span class="badge bg-${this.getAttendanceClass(summary.attendance_percentage)}">${summary.attendance_percentage}%</span></p>
+                            <p class="mb-0">${windows}</p>
                         </div>
                     </div>
                 </div>
@@ -461,22 +506,20 @@ class ReportsManager {
                             <th>Marked At</th>
                         </tr>
                     </thead>
-                    <tbody>
+                    <tbody id="student-history-tbody">
         `;
 
         data.attendance.forEach(record => {
-            const statusBadge = this.getStatusBadge(record.status);
-            html += `
-                <tr>
-                    <td>${window.app.formatDate(record.attendance_date)}</td>
-                    <td>${statusBadge}</td>
-                    <td>${record.remarks || ''}</td>
-                    <td>${window.app.formatDateTime(record.marked_at)}</td>
-                </tr>
-            `;
+            html += this.renderHistoryRow(record);
         });
 
-        html += '</tbody></table></div>';
+        html += `</tbody></table></div>
+            <div class="text-center">
+                <button class="btn btn-outline-primary ${data.has_more ? '' : 'd-none'}" id="student-history-more"
+                        onclick="window.reportsManager.loadMoreStudentHistory()">
+                    <i class="bi bi-arrow-down-circle"></i> Load more
+                </button>
+            </div>`;
         container.innerHTML = html;
     }
 
@@ -508,8 +551,9 @@ class ReportsManager {
     async exportMonthlyReport() {
         try {
             const month = document.getElementById('report-month').value;
-            const year = document.getElementById('report-year').value;
-            const batch = document.getElementById('report-batch').value;
+            const year = this.currentYear || new Date().getFullYear();
+            const college = document.getElementById('report-college').value;
+            const batch = college || document.getElementById('report-batch').value;
             const course = document.getElementById('report-course').value;
 
             const params = new URLSearchParams({ format: 'csv' });
@@ -546,10 +590,11 @@ class ReportsManager {
     async exportDailyReport() {
         try {
             const date = document.getElementById('daily-report-date').value;
-            const batch = document.getElementById('daily-report-batch').value;
+            const college = document.getElementById('daily-report-college').value;
+            const batch = college || document.getElementById('daily-report-batch').value;
             const course = document.getElementById('daily-report-course').value;
 
-            const params = new URLSearchParams();
+            const params = new URLSearchParams({ format: 'csv' });
             if (batch) params.append('batch', batch);
             if (course) params.append('course', course);
 
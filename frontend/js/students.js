@@ -3,6 +3,11 @@ class StudentsManager {
     constructor() {
         this.students = [];
         this.filteredStudents = [];
+        this.pageSize = 50;
+        this.nextCursor = null;
+        this.total = null;
+        // Ignore responses to searches the user has already typed past
+        this.requestSeq = 0;
         this.init();
     }
 
@@ -57,6 +62,20 @@ class StudentsManager {
             this.clearFilters();
         });
 
+        document.getElementById('import-students')?.addEventListener('click', () => {
+            document.getElementById('import-students-file').click();
+        });
+
+        document.getElementById('import-students-file')?.addEventListener('change', (e) => {
+            const file = e.target.files[0];
+            e.target.value = '';
+            if (file) this.importStudents(file);
+        });
+
+        document.getElementById('load-more-students')?.addEventListener('click', () => {
+            this.loadStudents(true);
+        });
+
         // Student form validation
         document.getElementById('student-form')?.addEventListener('submit', (e) => {
             e.preventDefault();
@@ -64,16 +83,36 @@ class StudentsManager {
         });
     }
 
-    async loadStudents() {
+    async loadStudents(append = false) {
+        // Search, filters and paging run server-side; only the visible page is fetched
+        const params = new URLSearchParams({
+            limit: this.pageSize,
+            fields: 'id,roll_number,first_name,last_name,email,phone,course,batch,status'
+        });
+        const search = document.getElementById('search-students')?.value.trim();
+        const batch = document.getElementById('filter-batch')?.value;
+        const course = document.getElementById('filter-course')?.value;
+        if (search) params.set('q', search);
+        if (batch) params.set('batch', batch);
+        if (course) params.set('course', course);
+        if (append && this.nextCursor) params.set('cursor', this.nextCursor);
+
+        const seq = ++this.requestSeq;
         try {
             window.app.showSpinner();
 
-            const response = await window.app.api('/api/students');
+            const response = await window.app.api(`/api/students?${params}`);
             const data = await response.json();
-            // Handle wrapped response
-            this.students = Array.isArray(data) ? data : (data.students || []);
-            
-            this.filteredStudents = [...this.students];
+            if (seq !== this.requestSeq) return;
+            if (!data.success) {
+                throw new Error(data.error || 'Failed to load students');
+            }
+
+            const page = data.students || [];
+            this.students = append ? this.students.concat(page) : page;
+            this.nextCursor = data.next_cursor || null;
+            if (!append) this.total = data.total ?? page.length;
+            this.filteredStudents = this.students;
             
             this.renderStudentsTable();
         } catch (error) {
@@ -86,6 +125,11 @@ class StudentsManager {
 
     renderStudentsTable() {
         const tbody = document.getElementById('students-tbody');
+        const count = document.getElementById('students-count');
+        if (count) {
+            count.textContent = this.total ? `Showing ${this.students.length} of ${this.total}` : '';
+        }
+        document.getElementById('load-more-students')?.classList.toggle('d-none', !this.nextCursor);
         
         if (!this.filteredStudents || this.filteredStudents.length === 0) {
             tbody.innerHTML = `
@@ -135,32 +179,15 @@ class StudentsManager {
     }
 
     filterStudents() {
-        const search = document.getElementById('search-students').value.toLowerCase();
-        const batchFilter = document.getElementById('filter-batch').value;
-        const courseFilter = document.getElementById('filter-course').value;
-
-        this.filteredStudents = this.students.filter(student => {
-            const matchesSearch = !search || 
-                student.first_name.toLowerCase().includes(search) ||
-                student.last_name.toLowerCase().includes(search) ||
-                student.roll_number.toLowerCase().includes(search) ||
-                (student.email && student.email.toLowerCase().includes(search));
-
-            const matchesBatch = !batchFilter || student.batch === batchFilter;
-            const matchesCourse = !courseFilter || student.course === courseFilter;
-
-            return matchesSearch && matchesBatch && matchesCourse;
-        });
-
-        this.renderStudentsTable();
+        this.nextCursor = null;
+        this.loadStudents();
     }
 
     clearFilters() {
         document.getElementById('search-students').value = '';
         document.getElementById('filter-batch').value = '';
         document.getElementById('filter-course').value = '';
-        this.filteredStudents = [...this.students];
-        this.renderStudentsTable();
+        this.filterStudents();
     }
 
     openAddStudentModal() {
@@ -323,6 +350,42 @@ class StudentsManager {
         }
     }
 
+    async importStudents(file) {
+        try {
+            window.app.showSpinner();
+
+            // Sent as the raw body so the server can validate rows as they stream in
+            const response = await window.app.api('/api/students/import', {
+                method: 'POST',
+                headers: { 'Content-Type': 'text/csv' },
+                body: file
+            });
+            const result = await response.json();
+            if (!result.success) {
+                throw new Error(result.error || 'Import failed');
+            }
+
+            let message = `Imported ${result.imported} of ${result.rows} students`;
+            if (result.failed) {
+                const shown = result.errors.slice(0, 5)
+                    .map(error => `line ${error.line}: ${this.escapeText(error.error)}`).join('<br>');
+                message += `, ${result.failed} failed:<br>${shown}`;
+                if (result.failed > 5) message += '<br>...';
+            }
+            window.app.showAlert(message, result.failed ? 'warning' : 'success', result.failed ? 15000 : 5000);
+
+            if (result.imported) {
+                await this.loadStudents();
+                await window.app.loadBatchesAndCourses();
+            }
+        } catch (error) {
+            console.error('Import students error:', error);
+            window.app.showAlert('Failed to import students: ' + error.message, 'danger');
+        } finally {
+            window.app.hideSpinner();
+        }
+    }
+
     async viewAttendance(studentId) {
         // Switch to reports section and load student report
         window.app.showSection('reports');
@@ -348,6 +411,13 @@ class StudentsManager {
         }, 500);
     }
 
+    escapeText(text) {
+        // Error messages can echo CSV content; never render it as HTML
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
     showStudentError(message) {
         const errorElement = document.getElementById('student-error');
         errorElement.textContent = message;
@@ -1,5 +1,5 @@
 // Service Worker for Calibo Attendance Tracker PWA
-const CACHE_NAME = 'calibo-attendance-v6';
+const CACHE_NAME = 'calibo-attendance-v12';
 const urlsToCache = [
   '/',
   '/index.html',
@@ -16,6 +16,133 @@ const urlsToCache = [
   'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js'
 ];
 
+// Offline attendance queue (IndexedDB)
+const SYNC_URL = '/api/v1/attendance/sync';
+const QUEUE_DB = 'calibo-offline';
+const QUEUE_STORE = 'attendance-queue';
+const SYNC_TAG = 'attendance-sync';
+
+function openQueue() {
+  return new Promise((resolve, reject) => {
+    const request = indexedDB.open(QUEUE_DB, 1);
+    request.onupgradeneeded = () => {
+      request.result.createObjectStore(QUEUE_STORE, { keyPath: 'id', autoIncrement: true });
+    };
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+function queueTransaction(mode, work) {
+  return openQueue().then((db) => new Promise((resolve, reject) => {
+    const tx = db.transaction(QUEUE_STORE, mode);
+    const result = work(tx.objectStore(QUEUE_STORE));
+    tx.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+    tx.onerror = () => reject(tx.error);
+  }));
+}
+
+function enqueueSync(entry) {
+  return queueTransaction('readwrite', (store) => store.add(entry));
+}
+
+function readQueue() {
+  return queueTransaction('readonly', (store) => store.getAll());
+}
+
+function removeFromQueue(id) {
+  return queueTransaction('readwrite', (store) => store.delete(id));
+}
+
+function notifyClients(message) {
+  return self.clients.matchAll().then((clients) => {
+    clients.forEach((client) => client.postMessage(message));
+  });
+}
+
+// Replay queued batches oldest first; the idempotency key makes retries safe
+let flushing = null;
+function flushQueue() {
+  if (flushing) {
+    return flushing;
+  }
+  flushing = (async () => {
+    const entries = await readQueue();
+    let synced = 0;
+    let skipped = 0;
+    for (const entry of entries) {
+      let response;
+      try {
+        response = await fetch(entry.url, {
+          method: 'POST',
+          credentials: 'include',
+          headers: { 'Content-Type': 'application/json', 'Idempotency-Key': entry.key },
+          body: entry.body
+        });
+      } catch (err) {
+        // Still offline: keep this and later entries for the next attempt
+        break;
+      }
+      if (response.status === 401) {
+        // Session expired: wait until the user logs in again
+        break;
+      }
+      // Other 4xx responses will never succeed, so drop them instead of blocking the queue
+      if (response.ok || (response.status >= 400 && response.status < 500)) {
+        await removeFromQueue(entry.id);
+        synced += 1;
+        if (response.ok) {
+          try {
+            const result = await response.json();
+            skipped += (result.skipped || []).length;
+          } catch (parseErr) {
+            // Counting skipped marks is best effort
+          }
+        }
+      } else {
+        break;
+      }
+    }
+    const remaining = (await readQueue()).length;
+    await notifyClients({ type: 'SYNC_COMPLETE', synced: synced, skipped: skipped, remaining: remaining });
+    return remaining;
+  })().finally(() => {
+    flushing = null;
+  });
+  return flushing;
+}
+
+async function handleSyncPost(request) {
+  let body = await request.clone().text();
+  try {
+    return await fetch(request);
+  } catch (err) {
+    let key = request.headers.get('Idempotency-Key');
+    try {
+      // Queued batches carry the server cursor the page marked against; on replay the
+      // server skips students someone else marked since
+      const payload = JSON.parse(body);
+      key = key || payload.idempotency_key;
+      payload.base_cursor = request.headers.get('X-Attendance-Cursor') || null;
+      body = JSON.stringify(payload);
+    } catch (parseErr) {
+      key = key || null;
+    }
+    await enqueueSync({ url: request.url, key: key, body: body });
+    if (self.registration.sync) {
+      try {
+        await self.registration.sync.register(SYNC_TAG);
+      } catch (syncErr) {
+        // Background Sync unsupported or denied; the page flushes on reconnect instead
+      }
+    }
+    return new Response(
+      JSON.stringify({ success: true, queued: true, idempotency_key: key }),
+      { status: 202, headers: { 'Content-Type': 'application/json' } }
+    );
+  }
+}
+
 // Install service worker
 self.addEventListener('install', (event) => {
   console.log('Service Worker: Installing...');
@@ -50,6 +177,12 @@ self.addEventListener('activate', (event) => {
 
 // Fetch events - Network first, then cache
 self.addEventListener('fetch', (event) => {
+  // Attendance sync posts are queued when the network is unavailable
+  if (event.request.method === 'POST' && new URL(event.request.url).pathname === SYNC_URL) {
+    event.respondWith(handleSyncPost(event.request));
+    return;
+  }
+
   // Skip non-GET requests
   if (event.request.method !== 'GET') {
     return;
@@ -108,4 +241,19 @@ self.addEventListener('message', (event) => {
   if (event.data && event.data.type === 'SKIP_WAITING') {
     self.skipWaiting();
   }
+  if (event.data && event.data.type === 'FLUSH_QUEUE') {
+    event.waitUntil(flushQueue());
+  }
+});
+
+// Background Sync: replay the offline queue once connectivity returns
+self.addEventListener('sync', (event) => {
+  if (event.tag === SYNC_TAG) {
+    event.waitUntil(flushQueue().then((remaining) => {
+      if (remaining > 0) {
+        // Reject so the browser schedules another attempt
+        throw new Error('Offline attendance queue not empty');
+      }
+    }));
+  }
 });
@@ -0,0 +1,28 @@
+# Gunicorn settings; gunicorn reads ./gunicorn.conf.py on its own
+#
+#   gunicorn --bind 0.0.0.0:$PORT wsgi:application
+#
+# gthread workers run GUNICORN_THREADS requests each, so a few processes keep
+# many requests in flight while they wait on Supabase, instead of one per
+# sync worker. The API itself is unchanged.
+import os
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+# Heartbeat timeout; keep SUPABASE_REQUEST_BUDGET below it
+timeout = 60
+preload_app = True
+
+# One pooled upstream connection per thread so busy threads don't churn sockets
+os.environ.setdefault('SUPABASE_POOL_SIZE', str(threads))
+
+# Warm-up (WARMUP=1) runs in each worker once it has loaded the app, never in
+# the preloading master, whose threads could be forked while holding a lock
+os.environ['WARMUP_IN_WORKERS'] = '1'
+
+
+def post_worker_init(worker):
+    from app import health_state
+    if health_state.warmup['status'] == 'pending':
+        health_state.start_warmup()
@@ -0,0 +1,127 @@
+"""
+Health probes and start-up warm-up for the Student Attendance Tracker
+
+GET /api/health/live  - the process is up and serving (no upstream calls)
+GET /api/health       - readiness: Supabase answers and warm-up (if any) is
+                        done; 503 otherwise. The upstream check is reused for
+                        HEALTH_CHECK_TTL seconds so frequent probes don't each
+                        cost a round trip.
+
+With WARMUP=1, warm-up steps (open pooled connections, fill the roster
+cache) run in a background thread at start-up, and /api/health answers
+503 "warming" until they finish, so the platform only routes traffic to a
+warm instance. Under gunicorn (WARMUP_IN_WORKERS, set by gunicorn.conf.py)
+the import only marks warm-up pending and each worker starts its own once
+forked: threads running in a preloading master could be forked while
+holding a lock (cache, metrics, urllib3 pool) that the worker then
+inherits locked.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import jsonify
+
+import metrics
+
+HEALTH_CHECK_TTL = float(os.environ.get('HEALTH_CHECK_TTL', 10))
+HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT', 2))
+
+
+class HealthState:
+    def __init__(self, client, warmup_steps=()):
+        self.client = client
+        self.warmup_steps = list(warmup_steps)
+        self.started_at = time.time()
+        self.import_seconds = None
+        self.warmup = {'status': 'disabled'}
+        self._check = None
+        self._lock = threading.Lock()
+
+    def set_import_time(self, seconds):
+        self.import_seconds = seconds
+        metrics.registry.set('app_startup_seconds', {'phase': 'import'}, seconds)
+
+    def check_upstream(self):
+        """{'ok', 'latency_ms', 'error', 'age_seconds'}, re-checked at most every HEALTH_CHECK_TTL"""
+        with self._lock:
+            if self._check is None or time.monotonic() - self._check[0] >= HEALTH_CHECK_TTL:
+                try:
+                    latency = self.client.ping(timeout=HEALTH_CHECK_TIMEOUT)
+                    result = {'ok': True, 'latency_ms': round(latency * 1000, 1), 'error': None}
+                except Exception as e:
+                    result = {'ok': False, 'latency_ms': None, 'error': str(e)}
+                self._check = (time.monotonic(), result)
+            checked_at, result = self._check
+        return dict(result, age_seconds=round(time.monotonic() - checked_at, 1))
+
+    def start_warmup(self):
+        self.warmup = {'status': 'running', 'seconds': None, 'errors': []}
+        thread = threading.Thread(target=self._run_warmup, name='warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def _run_warmup(self):
+        start = time.perf_counter()
+        errors = []
+
+        def ping():
+            self.client.ping(timeout=HEALTH_CHECK_TIMEOUT)
+
+        def run(step):
+            try:
+                step()
+            except Exception as e:
+                errors.append(f'{step.__name__}: {e}')
+
+        # Side by side, so each step opens (and leaves in the pool) its own connection
+        steps = [ping] + self.warmup_steps
+        with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix='warmup') as pool:
+            list(pool.map(run, steps))
+
+        seconds = time.perf_counter() - start
+        self.warmup = {'status': 'failed' if errors else 'done', 'seconds': round(seconds, 3), 'errors': errors}
+        metrics.registry.set('app_startup_seconds', {'phase': 'warmup'}, seconds)
+        print(f"Warm-up {self.warmup['status']} in {seconds * 1000:.0f} ms" +
+              (f": {'; '.join(errors)}" if errors else ''))
+
+    def report(self):
+        upstream = self.check_upstream()
+        warming = self.warmup['status'] in ('pending', 'running')
+        # A failed warm-up only means cold caches; readiness follows the upstream check
+        ready = upstream['ok'] and not warming
+        return ready, {
+            'status': 'ok' if ready else ('warming' if warming and upstream['ok'] else 'unavailable'),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'pid': os.getpid(),
+            'startup': {
+                'import_ms': round(self.import_seconds * 1000, 1) if self.import_seconds is not None else None,
+                'warmup': self.warmup
+            },
+            'upstream': upstream
+        }
+
+
+def init_health(app, client, warmup_steps=()):
+    state = HealthState(client, warmup_steps)
+
+    @app.route('/api/health/live', methods=['GET'])
+    def health_live():
+        return jsonify({'status': 'ok', 'uptime_seconds': round(time.time() - state.started_at, 1)})
+
+    @app.route('/api/health', methods=['GET'])
+    def health():
+        ready, body = state.report()
+        response = jsonify(body)
+        response.status_code = 200 if ready else 503
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    if app.config.get('WARMUP'):
+        if app.config.get('WARMUP_IN_WORKERS'):
+            # gunicorn.conf.py's post_worker_init hook calls start_warmup()
+            state.warmup = {'status': 'pending'}
+        else:
+            state.start_warmup()
+
+    return state
@@ -0,0 +1,267 @@
+"""
+Request metrics for the Student Attendance Tracker
+
+Records per-route latency, Supabase calls made while serving each request
+(count, time, bytes) and JSON serialization time. Totals are exposed in
+Prometheus text format; a per-request breakdown can be returned in a
+Server-Timing header.
+"""
+import contextvars
+import threading
+import time
+from urllib.parse import urlparse
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+METRIC_HELP = {
+    'http_request_duration_seconds': ('histogram', 'Time spent handling a request, by route'),
+    'http_request_supabase_calls': ('histogram', 'Supabase calls made while handling one request'),
+    'http_request_supabase_seconds': ('histogram', 'Time spent waiting on Supabase per request'),
+    'http_json_serialization_seconds': ('histogram', 'Time spent serializing JSON responses'),
+    'supabase_requests_total': ('counter', 'Supabase REST calls, by method, resource and status'),
+    'supabase_request_duration_seconds': ('histogram', 'Supabase REST call latency'),
+    'supabase_request_bytes_total': ('counter', 'Request body bytes sent to Supabase'),
+    'supabase_response_bytes_total': ('counter', 'Response body bytes received from Supabase'),
+    'supabase_coalesced_requests_total': ('counter', 'Supabase reads served by an identical in-flight call'),
+    'app_startup_seconds': ('gauge', 'Time spent starting this process, by phase (import, warmup)'),
+}
+
+# Profile of the request being served; copied into worker threads via submit()
+current_profile = contextvars.ContextVar('current_profile', default=None)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms keyed by metric name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._gauges = {}
+            self._histograms = {}
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count, h.buckets)) for key, h in self._histograms.items()
+            )
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described and name in METRIC_HELP:
+                kind, text = METRIC_HELP[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in counters + gauges:
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                le = labels + (('le', _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+class RequestProfile:
+    """Upstream and serialization costs accumulated while serving one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.supabase_calls = 0
+        self.supabase_seconds = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.json_seconds = 0.0
+
+    def add_call(self, elapsed, bytes_sent, bytes_received):
+        with self._lock:
+            self.supabase_calls += 1
+            self.supabase_seconds += elapsed
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+
+    def add_json(self, elapsed):
+        with self._lock:
+            self.json_seconds += elapsed
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'supabase;desc="{self.supabase_calls} calls, {self.bytes_received} bytes";'
+            f'dur={self.supabase_seconds * 1000:.2f}',
+            f'json;dur={self.json_seconds * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}'
+        ])
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that charges dumps() time to the current request"""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            profile = current_profile.get()
+            if profile is not None:
+                profile.add_json(time.perf_counter() - start)
+
+
+registry = MetricsRegistry()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _resource(url):
+    # /rest/v1/attendance -> attendance, /rest/v1/rpc/fn -> rpc/fn
+    path = urlparse(url).path
+    marker = '/rest/v1/'
+    return path.split(marker, 1)[1] if marker in path else path
+
+
+def record_supabase_call(method, url, status, elapsed, bytes_sent, bytes_received):
+    """SupabaseClient listener: global counters plus the current request's profile"""
+    resource = _resource(url)
+    registry.inc('supabase_requests_total', {'method': method, 'resource': resource, 'status': status})
+    registry.observe('supabase_request_duration_seconds', {'method': method, 'resource': resource}, elapsed)
+    registry.inc('supabase_request_bytes_total', {'resource': resource}, bytes_sent)
+    registry.inc('supabase_response_bytes_total', {'resource': resource}, bytes_received)
+
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_call(elapsed, bytes_sent, bytes_received)
+
+
+def record_supabase_coalesced(method, url, waited):
+    """SupabaseClient coalesce listener: reads that cost no upstream call"""
+    registry.inc('supabase_coalesced_requests_total', {'method': method, 'resource': _resource(url)})
+
+
+def submit(executor, fn, *args):
+    """executor.submit() that keeps the worker's Supabase calls attributed to this request"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _wants_server_timing(app):
+    return app.config.get('SERVER_TIMING') or request.headers.get('X-Server-Timing') == '1'
+
+
+def init_metrics(app, client):
+    app.json = TimedJSONProvider(app)
+    client.add_listener(record_supabase_call)
+    client.add_coalesce_listener(record_supabase_coalesced)
+
+    @app.before_request
+    def start_profile():
+        g.metrics_profile = RequestProfile()
+        g.metrics_token = current_profile.set(g.metrics_profile)
+
+    @app.after_request
+    def record_profile(response):
+        profile = g.pop('metrics_profile', None)
+        if profile is None:
+            return response
+
+        # Streamed bodies are still being produced here; their upstream calls
+        # show up in the supabase_* totals but not in this request's figures
+        total = time.perf_counter() - profile.start
+        route = _route()
+        registry.observe('http_request_duration_seconds', {
+            'method': request.method,
+            'route': route,
+            'status': response.status_code
+        }, total)
+        registry.observe('http_request_supabase_calls', {'route': route},
+                         profile.supabase_calls, buckets=CALL_COUNT_BUCKETS)
+        registry.observe('http_request_supabase_seconds', {'route': route}, profile.supabase_seconds)
+        if profile.json_seconds:
+            registry.observe('http_json_serialization_seconds', {'route': route}, profile.json_seconds)
+
+        if _wants_server_timing(app):
+            response.headers['Server-Timing'] = profile.server_timing(total)
+        return response
+
+    @app.teardown_request
+    def end_profile(exc):
+        token = g.pop('metrics_token', None)
+        if token is not None:
+            current_profile.reset(token)
+
+    return registry
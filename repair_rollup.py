@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Backfill or repair the attendance_daily_rollup table
+Usage: python repair_rollup.py [start_date] [end_date]
+
+Without dates the whole table is rebuilt from the attendance records.
+Run once after applying the schema, and again if counts ever drift
+(e.g. after bulk edits made with triggers disabled).
+"""
+import sys
+from datetime import datetime
+from supabase_config import get_supabase_client
+
+def parse_date(value):
+    datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+def main():
+    args = sys.argv[1:]
+    if len(args) > 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    try:
+        start_date = parse_date(args[0]) if len(args) > 0 else None
+        end_date = parse_date(args[1]) if len(args) > 1 else None
+    except ValueError:
+        print("❌ Dates must be in YYYY-MM-DD format")
+        sys.exit(1)
+    
+    print(f"Rebuilding attendance rollup for {start_date or 'beginning'} to {end_date or 'latest'}...")
+    
+    supabase = get_supabase_client()
+    response = supabase.rpc('refresh_attendance_daily_rollup', {
+        'p_start': start_date,
+        'p_end': end_date
+    }).execute()
+    
+    print(f"✅ Rollup rebuilt: {response.data} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Pluggable session backends for the Student Attendance Tracker
+
+SESSION_BACKEND selects the storage:
+    cookie     - signed stateless cookie (Flask default, zero I/O per request)
+    memory     - in-process dict with expiry sweeping (single worker only)
+    sqlite     - SQLite file with expiry sweeping (shared by workers on one host)
+    filesystem - legacy Flask-Session pickle files in flask_session/
+"""
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+SESSION_BACKENDS = ('cookie', 'memory', 'sqlite', 'filesystem')
+
+# Example keys from the templates and deployment docs; anyone can sign a cookie with them
+PLACEHOLDER_SECRET_KEYS = frozenset([
+    'your-secret-key-change-in-production',
+    'your-secret-key-change-this-to-random-string',
+    'calibo-attendance-2026-secure-key',
+    'random-secret-key-generate-one',
+    'any-random-string-here',
+    'paste-a-generated-key-here',
+])
+MIN_SECRET_KEY_LENGTH = 16
+
+
+def check_secret_key(key, backend):
+    """Raise ValueError unless key is fit to sign sessions for this backend.
+
+    The cookie backend stores admin_id in the cookie itself, so a guessable
+    key lets anyone log in; server-side backends only sign a random id.
+    """
+    hint = 'generate one with: python -c "import secrets; print(secrets.token_hex(32))"'
+    if not key:
+        raise ValueError(f"SECRET_KEY must be set; {hint}")
+    if backend == 'cookie' and (key in PLACEHOLDER_SECRET_KEYS or len(key) < MIN_SECRET_KEY_LENGTH):
+        raise ValueError(f"SESSION_BACKEND=cookie needs a private SECRET_KEY of at least "
+                         f"{MIN_SECRET_KEY_LENGTH} characters, not an example value; {hint}")
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class MemorySessionStore:
+    """Per-process session store; entries expire and are swept lazily"""
+
+    def __init__(self, maxsize=10000, sweep_interval=60):
+        self.maxsize = maxsize
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._data = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _sweep(self, now):
+        expired = [sid for sid, (expires_at, _) in self._data.items() if expires_at <= now]
+        for sid in expired:
+            del self._data[sid]
+        self._next_sweep = time.monotonic() + self.sweep_interval
+
+    def get(self, sid):
+        now = time.time()
+        with self._lock:
+            if time.monotonic() >= self._next_sweep:
+                self._sweep(now)
+            entry = self._data.get(sid)
+            if entry is None or entry[0] <= now:
+                return None
+            return entry[1]
+
+    def set(self, sid, data, expires_at):
+        with self._lock:
+            self._data[sid] = (expires_at, data)
+            if len(self._data) > self.maxsize:
+                self._sweep(time.time())
+                # Still full: drop the sessions closest to expiry
+                overflow = len(self._data) - self.maxsize
+                if overflow > 0:
+                    for old_sid, _ in sorted(self._data.items(), key=lambda item: item[1][0])[:overflow]:
+                        del self._data[old_sid]
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+
+class SQLiteSessionStore:
+    """Session rows in a local SQLite file; WAL mode lets several workers share it"""
+
+    def __init__(self, path, sweep_interval=300):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._next_sweep = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)')
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _maybe_sweep(self, conn, now):
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,))
+
+    def get(self, sid):
+        now = time.time()
+        conn = self._connect()
+        self._maybe_sweep(conn, now)
+        row = conn.execute(
+            'SELECT data FROM sessions WHERE sid = ? AND expires_at > ?', (sid, now)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, data, expires_at):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)',
+            (sid, data, expires_at)
+        )
+
+    def delete(self, sid):
+        self._connect().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Stores session data in a backend store; the cookie only carries a signed session id.
+
+    The store is only written when the session changes, so authenticated
+    reads cost one lookup and no writes.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-side-session')
+
+    def _lifetime(self, app, session):
+        if session.permanent:
+            return app.permanent_session_lifetime.total_seconds()
+        return 24 * 60 * 60
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('utf-8')
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(sid)
+                if data is not None:
+                    return ServerSideSession(self.serializer.loads(data), sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified:
+            return
+
+        self.store.set(session.sid, self.serializer.dumps(dict(session)), time.time() + self._lifetime(app, session))
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode('utf-8'),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def build_session_interface(backend, sqlite_path=None):
+    if backend == 'cookie':
+        return SecureCookieSessionInterface()
+    if backend == 'memory':
+        return ServerSideSessionInterface(MemorySessionStore())
+    if backend == 'sqlite':
+        return ServerSideSessionInterface(SQLiteSessionStore(sqlite_path or 'sessions.sqlite3'))
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+def init_session(app):
+    backend = app.config.get('SESSION_BACKEND', 'cookie')
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"SESSION_BACKEND must be one of {', '.join(SESSION_BACKENDS)}")
+    check_secret_key(app.config.get('SECRET_KEY'), backend)
+
+    if backend == 'filesystem':
+        # Legacy behaviour, kept for deployments that still rely on it
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+    else:
+        app.session_interface = build_session_interface(
+            backend, app.config.get('SESSION_SQLITE_PATH', os.path.join(app.instance_path, 'sessions.sqlite3'))
+        )
+    return app.session_interface
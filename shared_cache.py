@@ -0,0 +1,365 @@
+"""
+Cross-worker cache tier for the Student Attendance Tracker
+
+CACHE_BACKEND selects where roster and report cache entries are shared:
+    local  - nothing shared; each worker keeps its own in-process caches (default)
+    sqlite - SQLite file shared by the workers on one host; point
+             CACHE_SQLITE_PATH at tmpfs (e.g. /dev/shm/attendance-cache.sqlite3)
+             to keep it in memory
+    redis  - any Redis-compatible server at CACHE_REDIS_URL (needs the redis
+             package), shared by every worker on every host
+
+The in-process LRU caches in cache.py stay in front; this tier is only read
+on a local miss. Invalidation uses version stamps: every invalidation gets
+the next sequence number and records it against the stamps it covers
+(e.g. "date:2026-10-18|KL University"). A shared entry remembers the
+sequence number current when its computation started and is only served
+while none of its stamps is newer, so a result computed before a write in
+another worker is never served after it. Each invalidation is also
+broadcast (pub/sub on redis, an event table polled every
+CACHE_POLL_INTERVAL seconds on sqlite) so other workers drop their
+in-process entries within milliseconds. The listener starts on a process's
+first use of the store, not at import: under gunicorn --preload the import
+runs in the master, and a listener thread there could be forked into a
+worker while holding one of the caches' locks.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:
+    class WatchError(Exception):
+        """Raised by a stand-in client's pipeline when a watched key changed (redis not installed)"""
+
+CACHE_BACKENDS = ('local', 'sqlite', 'redis')
+CACHE_POLL_INTERVAL = float(os.environ.get('CACHE_POLL_INTERVAL', 0.05))
+# Larger stamp lists are looked up in chunks (SQLite caps bound parameters)
+STAMP_CHUNK_SIZE = 500
+
+
+def process_origin():
+    # Read at publish/receive time, so a forked worker gets its own
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def pack_entry(seq, stamps, meta, payload):
+    header = json.dumps({'seq': seq, 'stamps': list(stamps), 'meta': meta}, separators=(',', ':'))
+    return header.encode('utf-8') + b'\n' + payload
+
+
+def unpack_entry(data):
+    header, _, payload = data.partition(b'\n')
+    header = json.loads(header)
+    return header['seq'], header['stamps'], header['meta'], payload
+
+
+class SharedCacheStore:
+    """Entry storage, version stamps and the invalidation channel.
+
+    Backends implement version(), bump(), newest(), get(), set(),
+    _listen_start() and _listen(). The caches call snapshot(), load(), save(), publish() and
+    subscribe(), which only log store errors: an unreachable store costs
+    cache hits, never a request.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def snapshot(self):
+        """Current sequence number, to pass to save() once the value is computed"""
+        self._ensure_listener()
+        try:
+            return self.version()
+        except Exception as e:
+            print(f"Shared cache error: {e}")
+            return None
+
+    def load(self, key):
+        """(meta, payload) for a live entry whose stamps are unchanged since it was computed, else None"""
+        self._ensure_listener()
+        try:
+            data = self.get(key)
+            if data is None:
+                return None
+            seq, stamps, meta, payload = unpack_entry(data)
+            if self.newest(stamps) > seq:
+                return None
+            return meta, payload
+        except Exception as e:
+            print(f"Shared cache error: {e}")
+            return None
+
+    def save(self, key, seq, stamps, meta, payload, ttl):
+        if seq is None or ttl <= 0:
+            return False
+        try:
+            # Skip results that an invalidation overtook while they were computed
+            if self.newest(stamps) > seq:
+                return False
+            self.set(key, pack_entry(seq, stamps, meta, payload), ttl)
+            return True
+        except Exception as e:
+            print(f"Shared cache error: {e}")
+            return False
+
+    def publish(self, stamps, event):
+        """Bump stamps and tell the other workers; returns the new sequence number"""
+        self._ensure_listener()
+        try:
+            return self.bump(stamps, event)
+        except Exception as e:
+            print(f"Shared cache invalidation error: {e}")
+            return None
+
+    def subscribe(self, callback):
+        """Call callback(event) for invalidations published by other processes.
+
+        Listening starts with the first snapshot(), load() or publish() in
+        this process; a process holds no cached entries before then.
+        """
+        self._callbacks.append(callback)
+
+    def _ensure_listener(self):
+        listener = self._listener
+        if (listener is not None and listener.is_alive()) or not self._callbacks:
+            return
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                try:
+                    # Subscribed before the caller goes on, so no later invalidation is missed
+                    state = self._listen_start()
+                except Exception as e:
+                    print(f"Cache invalidation channel error: {e}")
+                    return
+                self._listener = threading.Thread(target=self._listen, args=(state,),
+                                                  name='cache-invalidation', daemon=True)
+                self._listener.start()
+
+    def _dispatch(self, origin, event):
+        if origin == process_origin():
+            return
+        for callback in self._callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Cache invalidation error: {e}")
+
+    def _after_fork(self):
+        # The listener thread doesn't survive fork; the child starts its own on first use
+        self._listener_lock = threading.Lock()
+        self._listener = None
+
+
+class SQLiteCacheStore(SharedCacheStore):
+    """Entries, stamps and an event log in one SQLite file (WAL, so workers read concurrently)"""
+
+    def __init__(self, path, poll_interval=CACHE_POLL_INTERVAL, event_ttl=300, sweep_interval=300):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.event_ttl = event_ttl
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._next_sweep = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE TABLE IF NOT EXISTS stamps (stamp TEXT PRIMARY KEY, seq INTEGER NOT NULL)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, '
+            'event TEXT NOT NULL, created_at REAL NOT NULL)'
+        )
+        super().__init__()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def version(self):
+        # sqlite_sequence keeps counting after old events are pruned
+        row = self._connect().execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+        return row[0] if row else 0
+
+    def bump(self, stamps, event):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            seq = conn.execute(
+                'INSERT INTO events (origin, event, created_at) VALUES (?, ?, ?)',
+                (process_origin(), json.dumps(event), time.time())
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO stamps (stamp, seq) VALUES (?, ?) '
+                'ON CONFLICT(stamp) DO UPDATE SET seq = excluded.seq',
+                [(stamp, seq) for stamp in stamps]
+            )
+            conn.execute('DELETE FROM events WHERE created_at < ?', (time.time() - self.event_ttl,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return seq
+
+    def newest(self, stamps):
+        stamps = list(stamps)
+        conn = self._connect()
+        newest = 0
+        for i in range(0, len(stamps), STAMP_CHUNK_SIZE):
+            chunk = stamps[i:i + STAMP_CHUNK_SIZE]
+            row = conn.execute(
+                f"SELECT MAX(seq) FROM stamps WHERE stamp IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchone()
+            newest = max(newest, row[0] or 0)
+        return newest
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT data FROM entries WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, data, ttl):
+        now = time.time()
+        conn = self._connect()
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            conn.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+        conn.execute(
+            'INSERT OR REPLACE INTO entries (key, data, expires_at) VALUES (?, ?, ?)',
+            (key, data, now + ttl)
+        )
+
+    def _listen_start(self):
+        return self.version()
+
+    def _listen(self, last):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                rows = self._connect().execute(
+                    'SELECT seq, origin, event FROM events WHERE seq > ? ORDER BY seq', (last,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Cache invalidation poll error: {e}")
+                continue
+            for seq, origin, event in rows:
+                last = seq
+                self._dispatch(origin, json.loads(event))
+
+    def _after_fork(self):
+        # Connections must not be shared with the parent
+        self._local = threading.local()
+        super()._after_fork()
+
+
+class RedisCacheStore(SharedCacheStore):
+    """Entries as keys with a TTL, stamps in one hash, invalidations on a pub/sub channel.
+
+    Pass client= to use an existing redis-py compatible client (any object
+    with the same get/set/hmget/pipeline/pubsub methods will do; without
+    redis installed its pipeline signals a conflict with shared_cache.WatchError).
+    """
+
+    def __init__(self, url=None, client=None, prefix='attendance-cache:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self.seq_key = f'{prefix}seq'
+        self.stamps_key = f'{prefix}stamps'
+        self.channel = f'{prefix}invalidations'
+        self.entry_prefix = f'{prefix}entry:'
+        super().__init__()
+
+    def version(self):
+        return int(self.client.get(self.seq_key) or 0)
+
+    def bump(self, stamps, event):
+        # Optimistic transaction: the sequence number and its stamps change together
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.seq_key)
+                    seq = int(pipe.get(self.seq_key) or 0) + 1
+                    pipe.multi()
+                    pipe.set(self.seq_key, seq)
+                    if stamps:
+                        pipe.hset(self.stamps_key, mapping={stamp: seq for stamp in stamps})
+                    pipe.publish(self.channel, json.dumps({'origin': process_origin(), 'event': event}))
+                    pipe.execute()
+                    return seq
+                except WatchError:
+                    continue
+
+    def newest(self, stamps):
+        stamps = list(stamps)
+        if not stamps:
+            return 0
+        return max((int(seq) for seq in self.client.hmget(self.stamps_key, stamps) if seq is not None), default=0)
+
+    def get(self, key):
+        return self.client.get(self.entry_prefix + key)
+
+    def set(self, key, data, ttl):
+        self.client.set(self.entry_prefix + key, data, px=max(int(ttl * 1000), 1))
+
+    def _listen_start(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+    def _listen(self, pubsub):
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = self._listen_start()
+                for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    data = json.loads(message['data'])
+                    self._dispatch(data['origin'], data['event'])
+            except Exception as e:
+                # Server restarts drop the subscription; reconnect after a pause
+                print(f"Cache invalidation channel error: {e}")
+                pubsub = None
+                time.sleep(1)
+
+
+def build_cache_store(backend, sqlite_path=None, redis_url=None):
+    if backend == 'local':
+        return None
+    if backend == 'sqlite':
+        return SQLiteCacheStore(sqlite_path or 'cache.sqlite3')
+    if backend == 'redis':
+        return RedisCacheStore(redis_url)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+def init_cache_store(app):
+    backend = app.config.get('CACHE_BACKEND', 'local')
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}")
+    return build_cache_store(
+        backend,
+        sqlite_path=app.config.get('CACHE_SQLITE_PATH', os.path.join(app.instance_path, 'cache.sqlite3')),
+        redis_url=app.config.get('CACHE_REDIS_URL')
+    )
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Bulk student import from CSV
+Usage: python student_import.py students.csv [--batch "KL University"] [--course "Calibo Training"] [--dry-run]
+
+The CSV needs a header row with at least roll_number, first_name and
+last_name; email, phone, batch, course and status are optional (--batch,
+--course and --status fill in missing values). Rows are validated as they
+are read and upserted on roll_number in chunks, so an existing student is
+updated in place and re-running an import is safe. Memory holds one chunk
+plus the roll numbers seen so far (to reject duplicates within the file).
+"""
+import argparse
+import csv
+import io
+import sys
+import requests
+from supabase_config import get_supabase_client
+
+IMPORT_CHUNK_SIZE = 500
+# Keep the error report bounded for files that are wrong on every line
+MAX_REPORTED_ERRORS = 1000
+
+# Column -> max length, mirroring the students table in supabase_schema.sql
+STUDENT_COLUMNS = {
+    'roll_number': 50,
+    'first_name': 100,
+    'last_name': 100,
+    'email': 100,
+    'phone': 20,
+    'batch': 100,
+    'course': 100,
+    'status': 20,
+}
+REQUIRED_COLUMNS = ('roll_number', 'first_name', 'last_name', 'batch', 'course')
+STUDENT_STATUSES = ('active', 'inactive')
+
+
+def normalize_header(name):
+    return (name or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def validate_row(row, defaults, columns=STUDENT_COLUMNS):
+    """Clean one CSV row; returns (record, error) with exactly one of them set.
+
+    Only `columns` end up in the record, so an import without e.g. a phone
+    column leaves existing phone numbers alone.
+    """
+    record = {}
+    for column in columns:
+        max_length = STUDENT_COLUMNS[column]
+        value = (row.get(column) or '').strip() or defaults.get(column)
+        if value and len(value) > max_length:
+            return None, f'{column} is longer than {max_length} characters'
+        record[column] = value or None
+
+    missing = [column for column in REQUIRED_COLUMNS if not record.get(column)]
+    if missing:
+        return None, f"Missing {', '.join(missing)}"
+    if record.get('email') and '@' not in record['email']:
+        return None, f"Invalid email: {record['email']}"
+    if 'status' in record:
+        record['status'] = (record['status'] or 'active').lower()
+        if record['status'] not in STUDENT_STATUSES:
+            return None, f"Invalid status: {record['status']} (expected active or inactive)"
+    return record, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, roll_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'roll_number': roll_number, 'error': message})
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def _upsert(client, chunk, report):
+    """Upsert (line, record) pairs; a rejected chunk is split until the bad rows are isolated.
+
+    Only row-level rejections are split; any other HTTP error (bad key,
+    missing table or column, server error) would fail every row alike and
+    is raised.
+    """
+    try:
+        response = client.table('students').upsert(
+            [record for _, record in chunk], on_conflict='roll_number', chunk_size=None
+        ).execute()
+        report.imported += len(response.data)
+    except requests.exceptions.HTTPError as e:
+        if not _is_row_error(e):
+            raise
+        if len(chunk) > 1:
+            middle = len(chunk) // 2
+            _upsert(client, chunk[:middle], report)
+            _upsert(client, chunk[middle:], report)
+            return
+        message = _error_message(e)
+        for line, record in chunk:
+            report.error(line, record['roll_number'], message)
+    except requests.exceptions.RequestException as e:
+        for line, record in chunk:
+            report.error(line, record['roll_number'], str(e))
+
+
+def _is_row_error(error):
+    # 400/409 with a PostgreSQL data exception (22xxx) or constraint violation (23xxx)
+    response = error.response
+    if response is None or response.status_code not in (400, 409):
+        return False
+    try:
+        code = str(response.json().get('code') or '')
+    except (AttributeError, ValueError):
+        return False
+    return code[:2] in ('22', '23')
+
+
+def _error_message(error):
+    # PostgREST puts the database error in the JSON body
+    try:
+        return error.response.json().get('message') or str(error)
+    except (AttributeError, ValueError):
+        return str(error)
+
+
+def import_students(client, stream, defaults=None, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE, report=None):
+    """Stream a CSV (text file object) into the students table.
+
+    Returns an ImportReport; rows that fail validation or are rejected by
+    the database are listed there by line number and the rest still import.
+    Raises ValueError if the header is missing a required column or the
+    file can't be decoded, csv.Error for malformed CSV and HTTPError for
+    upstream errors that aren't about a row. Chunks before the error stay
+    imported; pass report= to keep their count.
+    """
+    defaults = {column: value for column, value in (defaults or {}).items() if value}
+    report = report if report is not None else ImportReport()
+    reader = csv.reader(stream)
+    header = [normalize_header(name) for name in next(reader, [])]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header and column not in defaults]
+    if missing:
+        raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+
+    # Every record carries the same keys, as PostgREST bulk upserts require
+    columns = [column for column in STUDENT_COLUMNS if column in header or column in defaults]
+
+    # Postgres rejects an upsert that touches the same roll number twice, so catch repeats here
+    seen = set()
+    chunk = []
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        report.rows += 1
+        line = reader.line_num
+        row = dict(zip(header, values))
+        record, error = validate_row(row, defaults, columns)
+        if error:
+            report.error(line, (row.get('roll_number') or '').strip() or None, error)
+            continue
+        if record['roll_number'] in seen:
+            report.error(line, record['roll_number'], 'Duplicate roll_number in file')
+            continue
+        seen.add(record['roll_number'])
+
+        if dry_run:
+            report.imported += 1
+            continue
+        chunk.append((line, record))
+        if len(chunk) >= chunk_size:
+            _upsert(client, chunk, report)
+            chunk = []
+
+    if chunk:
+        _upsert(client, chunk, report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('csv_file', help="CSV file to import ('-' for stdin)")
+    parser.add_argument('--batch', help='batch for rows without one')
+    parser.add_argument('--course', help='course for rows without one')
+    parser.add_argument('--status', help='status for rows without one (default active)')
+    parser.add_argument('--dry-run', action='store_true', help='validate only, write nothing')
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    client = None if args.dry_run else get_supabase_client()
+    defaults = {'batch': args.batch, 'course': args.course, 'status': args.status}
+
+    if args.csv_file == '-':
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+    else:
+        stream = open(args.csv_file, encoding='utf-8-sig', newline='')
+    report = ImportReport()
+    try:
+        import_students(client, stream, defaults, dry_run=args.dry_run,
+                        chunk_size=max(args.chunk_size, 1), report=report)
+    except (ValueError, csv.Error, requests.exceptions.RequestException) as e:
+        print(f"❌ {e}")
+        if report.imported and not args.dry_run:
+            print(f"{report.imported} rows were imported before the error.")
+            print("Call POST /api/students/cache/invalidate (or restart the app) to refresh cached rosters.")
+        sys.exit(1)
+    finally:
+        stream.close()
+
+    verb = 'valid' if args.dry_run else 'imported'
+    print(f"{'✅' if not report.failed else '⚠️'} {report.imported} of {report.rows} rows {verb}, {report.failed} failed")
+    for error in report.errors:
+        print(f"  line {error['line']} ({error['roll_number'] or '?'}): {error['error']}")
+    if report.failed > len(report.errors):
+        print(f"  ... and {report.failed - len(report.errors)} more")
+    if not args.dry_run and report.imported:
+        print("Call POST /api/students/cache/invalidate (or restart the app) to refresh cached rosters.")
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,137 @@
 Supabase Configuration for Student Attendance Tracker
 """
 import os
+import threading
+import time
 import requests
 import json
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# .env next to the code, then the PythonAnywhere project folder; variables
+# already set in the environment win
+ENV_FILES = (
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'),
+    os.path.expanduser('~/attendance_tracker/.env'),
+)
+
+
+def load_env():
+    # Module-level settings below read os.environ, so this runs at import;
+    # python-dotenv is only imported when there is a file to read
+    for path in ENV_FILES:
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return path
+    return None
+
+
+load_env()
+
+# Connection pool / transport defaults (overridable via environment)
+DEFAULT_POOL_SIZE = int(os.environ.get('SUPABASE_POOL_SIZE', 10))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get('SUPABASE_CONNECT_TIMEOUT', 3.05))
+# Supabase cancels API statements after 8 s, so a longer read wait only delays the error
+DEFAULT_READ_TIMEOUT = float(os.environ.get('SUPABASE_READ_TIMEOUT', 15))
+DEFAULT_MAX_RETRIES = int(os.environ.get('SUPABASE_MAX_RETRIES', 3))
+DEFAULT_RETRY_BACKOFF = float(os.environ.get('SUPABASE_RETRY_BACKOFF', 0.3))
+# Worst-case seconds one call may spend including retries; keep below gunicorn --timeout
+DEFAULT_REQUEST_BUDGET = float(os.environ.get('SUPABASE_REQUEST_BUDGET', 50))
+
+# Max rows per bulk insert/upsert request body
+DEFAULT_CHUNK_SIZE = int(os.environ.get('SUPABASE_CHUNK_SIZE', 500))
+
+# Rows per page when streaming (Supabase caps responses at 1000 rows by default)
+DEFAULT_PAGE_SIZE = int(os.environ.get('SUPABASE_PAGE_SIZE', 1000))
+
+# Values per in.() request; ~150 UUIDs keeps the URL near 6 KB, well inside proxy limits
+DEFAULT_IN_CHUNK_SIZE = int(os.environ.get('SUPABASE_IN_CHUNK_SIZE', 150))
+
+# Only verbs that are safe to replay are retried automatically
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+# Identical concurrent reads share one upstream call (see SupabaseClient.request)
+DEFAULT_COALESCE = os.environ.get('SUPABASE_COALESCE', '1').lower() in ('1', 'true', 'yes')
+COALESCE_METHODS = frozenset(['GET', 'HEAD'])
+
+
+def status_retries(max_retries, connect_timeout, read_timeout, budget):
+    """Retries on 502/503/504 that fit in budget when every attempt takes its full timeouts"""
+    attempts = int(budget // (connect_timeout + read_timeout))
+    return max(0, min(max_retries, attempts - 1))
+
+
+class RequestStats:
+    """Thread-safe per-method latency counters for upstream requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, method):
+        return self._stats.setdefault(method, {
+            'count': 0,
+            'errors': 0,
+            'coalesced': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0
+        })
+
+    def record(self, method, elapsed, error=False):
+        with self._lock:
+            entry = self._entry(method)
+            elapsed_ms = elapsed * 1000
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            if error:
+                entry['errors'] += 1
+
+    def record_coalesced(self, method):
+        # Served by another thread's identical call; not counted as a request
+        with self._lock:
+            self._entry(method)['coalesced'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for method, entry in self._stats.items():
+                result[method] = dict(entry)
+                result[method]['avg_ms'] = round(entry['total_ms'] / entry['count'], 3) if entry['count'] else 0
+                result[method]['total_ms'] = round(entry['total_ms'], 3)
+                result[method]['max_ms'] = round(entry['max_ms'], 3)
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+class InFlightCall:
+    """One upstream read that identical concurrent reads wait on"""
+    __slots__ = ('done', 'response', 'error', 'writes')
+
+    def __init__(self, writes):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+        # Writes this client had finished when the call started
+        self.writes = writes
+
+
+def _freeze(value):
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        value = sorted(value.items())
+    return tuple(value)
 
-# Load environment variables
-project_folder = os.path.expanduser('~/attendance_tracker')
-load_dotenv(os.path.join(project_folder, '.env'))
 
 class SupabaseClient:
-    def __init__(self, url, key):
+    def __init__(self, url, key, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 retry_backoff=DEFAULT_RETRY_BACKOFF, coalesce=DEFAULT_COALESCE):
         self.url = url
         self.key = key
         self.headers = {
@@ -20,26 +141,257 @@ class SupabaseClient:
             "Content-Type": "application/json",
             "Prefer": "return=representation"
         }
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = RequestStats()
+        self.listeners = []
+        self.coalesce_listeners = []
+        self.session = self._build_session(pool_size, max_retries, retry_backoff, connect_timeout, read_timeout)
+        self._probe_session = None
+        self.coalesce = coalesce
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._writes = 0
+
+    def _build_session(self, pool_size, max_retries, retry_backoff, connect_timeout, read_timeout):
+        # One keep-alive session per client; urllib3 pools are thread-safe
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            # A read that timed out already used the full read timeout; retrying it could outlast the worker
+            read=0,
+            status=status_retries(max_retries, connect_timeout, read_timeout, DEFAULT_REQUEST_BUDGET),
+            backoff_factor=retry_backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def add_listener(self, listener):
+        # listener(method, url, status, elapsed, bytes_sent, bytes_received) after every request
+        self.listeners.append(listener)
+
+    def add_coalesce_listener(self, listener):
+        # listener(method, url, waited) when a read was served by an identical in-flight call
+        self.coalesce_listeners.append(listener)
+
+    def request(self, method, url, read_only=False, **kwargs):
+        """Send one request; identical concurrent reads are coalesced.
+
+        A read (GET/HEAD, or read_only for e.g. a STABLE rpc) with the same
+        URL, params, headers and body as one already in flight waits for it
+        and gets the same Response (and exception) instead of making its
+        own call, so upstream load follows distinct queries rather than
+        concurrent users. Reads only join a call that started after this
+        client's last completed write, so a thread never gets data older
+        than its own writes.
+        """
+        read_only = read_only or method in COALESCE_METHODS
+        if not self.coalesce or not read_only or kwargs.get('stream'):
+            return self._send(method, url, read_only, **kwargs)
+
+        key = (method, url, _freeze(kwargs.get('params')), _freeze(kwargs.get('headers')),
+               json.dumps(kwargs.get('json'), sort_keys=True, default=str))
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            leader = call is None or call.writes != self._writes
+            if leader:
+                call = InFlightCall(self._writes)
+                self._inflight[key] = call
+
+        if leader:
+            try:
+                call.response = self._send(method, url, read_only, **kwargs)
+                return call.response
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._inflight_lock:
+                    if self._inflight.get(key) is call:
+                        del self._inflight[key]
+                call.done.set()
+
+        start = time.perf_counter()
+        call.done.wait()
+        self.stats.record_coalesced(method)
+        for listener in self.coalesce_listeners:
+            try:
+                listener(method, url, time.perf_counter() - start)
+            except Exception as e:
+                print(f"Request listener error: {e}")
+        if call.error is not None:
+            raise call.error
+        return call.response
+
+    def _send(self, method, url, read_only, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        error = False
+        response = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            error = response.status_code >= 400
+            return response
+        except requests.exceptions.RequestException:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            if not read_only:
+                with self._inflight_lock:
+                    self._writes += 1
+            self.stats.record(method, elapsed, error)
+            if self.listeners:
+                self._notify(method, url, response, elapsed)
+
+    def _notify(self, method, url, response, elapsed):
+        status = response.status_code if response is not None else 0
+        bytes_sent = bytes_received = 0
+        if response is not None:
+            body = response.request.body
+            bytes_sent = len(body) if body else 0
+            bytes_received = len(response.content or b'')
+        for listener in self.listeners:
+            try:
+                listener(method, url, status, elapsed, bytes_sent, bytes_received)
+            except Exception as e:
+                print(f"Request listener error: {e}")
+
+    def ping(self, timeout=2.0):
+        """One tiny PostgREST round trip, without retries; returns its latency in seconds.
+
+        Uses its own keep-alive session so a health probe is bounded by
+        `timeout` instead of the retry policy, and measures steady-state latency.
+        """
+        if self._probe_session is None:
+            self._probe_session = requests.Session()
+        start = time.perf_counter()
+        response = self._probe_session.get(
+            f"{self.url.rstrip('/')}/rest/v1/students",
+            headers=self.headers,
+            params={'select': 'id', 'limit': '1'},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    def get_stats(self):
+        return self.stats.snapshot()
+
+    def close(self):
+        self.session.close()
+        if self._probe_session is not None:
+            self._probe_session.close()
 
     def table(self, table_name):
-        return SupabaseQueryBuilder(self.url, self.headers, table_name)
+        return SupabaseQueryBuilder(self, table_name)
+
+    def rpc(self, function_name, params=None, read_only=False):
+        # Call a Postgres function exposed at /rest/v1/rpc/<function_name>;
+        # read_only (STABLE/IMMUTABLE functions) lets identical concurrent calls coalesce
+        builder = SupabaseQueryBuilder(self, f"rpc/{function_name}")
+        builder.method = 'POST'
+        builder.json_data = params or {}
+        builder.is_rpc = True
+        builder.read_only = read_only
+        return builder
+
+
+class LazySupabaseClient:
+    """Stand-in for SupabaseClient that builds the real one on first use.
+
+    Importing the app then needs neither credentials nor sockets (missing
+    settings surface on the first query and in /api/health instead of
+    failing the import), and a process forked after import (gunicorn
+    --preload) gets its own connection pool rather than sharing the parent's.
+    """
+
+    def __init__(self, factory=None):
+        self._factory = factory or get_supabase_client
+        self._client = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    client = self._factory()
+                    for register, listener in self._listeners:
+                        getattr(client, register)(listener)
+                    self._client = client
+                client = self._client
+        return client
+
+    @property
+    def initialized(self):
+        return self._client is not None
+
+    def add_listener(self, listener):
+        self._register('add_listener', listener)
+
+    def add_coalesce_listener(self, listener):
+        self._register('add_coalesce_listener', listener)
+
+    def _register(self, register, listener):
+        # Kept here so listeners survive a rebuild (e.g. after fork)
+        with self._lock:
+            self._listeners.append((register, listener))
+            if self._client is not None:
+                getattr(self._client, register)(listener)
+
+    def _after_fork(self):
+        # The child must not share the parent's sockets; drop without closing them
+        self._lock = threading.Lock()
+        self._client = None
+
+    def __getattr__(self, name):
+        # table(), rpc(), request(), ... of the real client
+        return getattr(self.get(), name)
 
-import requests
-import json
-import os
 
 class SupabaseQueryBuilder:
-    def __init__(self, base_url, headers, table_name):
-        self.base_url = base_url.rstrip('/')
-        self.headers = headers
+    def __init__(self, client, table_name):
+        self.client = client
+        self.base_url = client.url.rstrip('/')
+        # Copy so per-query Prefer headers never leak into the shared client
+        self.headers = dict(client.headers)
         self.table_url = f"{self.base_url}/rest/v1/{table_name}"
         self.params = {}
+        # Filters are kept separately so one column can carry several (e.g. gte + lte)
+        self.filters = []
         self.method = 'GET'
         self.json_data = None
+        self.chunk_size = None
+        self.count_mode = None
+        self.is_rpc = False
+        self.read_only = False
 
-    def select(self, columns="*"):
+    def select(self, *columns):
+        # select('id,status') or select('id', 'status'); no columns means all ('*')
         self.method = 'GET'
-        self.params["select"] = columns
+        self.params["select"] = ','.join(columns) if columns else '*'
+        return self
+
+    def join(self, resource, columns='', inner=True):
+        """Embed a related table in the select: join('students', 'batch') adds students!inner(batch).
+
+        With inner=True, filters on the embedded columns, e.g.
+        eq('students.batch', 'KL University'), drop non-matching parent rows in
+        the database. Empty columns filter without returning the embedded row.
+        """
+        embed = f"{resource}{'!inner' if inner else ''}({columns})"
+        self.params["select"] = f"{self.params.get('select', '*')},{embed}"
         return self
 
     def insert(self, data, count=None):
@@ -50,6 +402,17 @@ class SupabaseQueryBuilder:
         self.json_data = data
         return self
 
+    def upsert(self, data, on_conflict=None, ignore_duplicates=False, chunk_size=DEFAULT_CHUNK_SIZE):
+        # Array insert resolved by PostgREST against the on_conflict columns
+        self.method = 'POST'
+        resolution = 'ignore-duplicates' if ignore_duplicates else 'merge-duplicates'
+        self.headers['Prefer'] = f'resolution={resolution},return=representation'
+        if on_conflict:
+            self.params['on_conflict'] = on_conflict
+        self.json_data = data
+        self.chunk_size = chunk_size
+        return self
+
     def update(self, data, count=None):
         self.method = 'PATCH'
         self.headers['Prefer'] = 'return=representation'
@@ -60,24 +423,54 @@ class SupabaseQueryBuilder:
 
     def delete(self, count=None):
         self.method = 'DELETE'
-        self.headers['Prefer'] = 'return=representation' 
+        self.headers['Prefer'] = 'return=representation'
         if count:
              self.headers['Prefer'] += f',count={count}'
         return self
 
+    def _filter(self, column, operator, value):
+        self.filters.append((column, f"{operator}.{value}"))
+        return self
+
     def eq(self, column, value):
         # Properly format as column=eq.value (not separate params)
-        self.params[f"{column}"] = f"eq.{value}"
-        return self
-    
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._filter(column, 'neq', value)
+
+    def in_(self, column, values):
+        # column=in.(a,b,"c,d"); values with PostgREST delimiters are double-quoted
+        return self._filter(column, 'in', f"({','.join(_quote_value(value) for value in values)})")
+
+    def is_(self, column, value):
+        # IS NULL / TRUE / FALSE (None means null)
+        value = 'null' if value is None else str(value).lower()
+        return self._filter(column, 'is', value)
+
+    def gt(self, column, value):
+        return self._filter(column, 'gt', value)
+
     def gte(self, column, value):
-        self.params[column] = f"gte.{value}"
-        return self
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self._filter(column, 'lt', value)
 
     def lte(self, column, value):
-        self.params[column] = f"lte.{value}"
+        return self._filter(column, 'lte', value)
+
+    def or_(self, filters):
+        # Any of several filters, e.g. or_('first_name.ilike.*ann*,last_name.ilike.*ann*');
+        # repeated calls are ANDed together
+        self.filters.append(('or', f"({filters})"))
         return self
-        
+
+    def after(self, keyset, row):
+        # Rows strictly after `row` in ascending keyset order (cursor pagination)
+        self.filters.append(('or', _keyset_filter(keyset, row)))
+        return self
+
     def order(self, column, desc=False):
         order_val = f"{column}.desc" if desc else f"{column}.asc"
         # Handle multiple orders if needed, but simple append for now
@@ -86,31 +479,50 @@ class SupabaseQueryBuilder:
         else:
              self.params["order"] = order_val
         return self
-    
-    def execute(self):
+
+    def limit(self, count):
+        self.params["limit"] = str(count)
+        return self
+
+    def offset(self, count):
+        self.params["offset"] = str(count)
+        return self
+
+    def range(self, start, end):
+        # Inclusive row range, same semantics as the HTTP Range header
+        self.params["offset"] = str(start)
+        self.params["limit"] = str(end - start + 1)
+        return self
+
+    def count(self, mode='exact'):
+        # Ask PostgREST for the total row count (returned in Content-Range)
+        self.count_mode = mode
+        prefer = [p for p in self.headers.get('Prefer', '').split(',') if p and not p.startswith('count=')]
+        prefer.append(f'count={mode}')
+        self.headers['Prefer'] = ','.join(prefer)
+        return self
+
+    def if_none_match(self, etag):
+        # Conditional GET; a 304 comes back as a response with not_modified=True
+        if etag:
+            self.headers['If-None-Match'] = etag
+        return self
+
+    def _request(self, json_data=None):
+        response = None
         try:
-            if self.method == 'GET':
-                response = requests.get(self.table_url, headers=self.headers, params=self.params)
-            elif self.method == 'POST':
-                response = requests.post(self.table_url, headers=self.headers, params=self.params, json=self.json_data)
-            elif self.method == 'PATCH':
-                response = requests.patch(self.table_url, headers=self.headers, params=self.params, json=self.json_data)
-            elif self.method == 'DELETE':
-                response = requests.delete(self.table_url, headers=self.headers, params=self.params)
-            
+            response = self.client.request(
+                self.method,
+                self.table_url,
+                read_only=self.read_only,
+                headers=self.headers,
+                params=self._query_params(),
+                json=json_data
+            )
+
             response.raise_for_status()
-            
-            # Helper for empty responses (e.g., 204 No Content)
-            if response.status_code == 204:
-                 return type('Response', (), {'data': [], 'count': 0})
-            
-            try:
-                data = response.json()
-            except ValueError:
-                data = []
+            return response
 
-            return type('Response', (), {'data': data, 'count': len(data) if isinstance(data, list) else 0})
-            
         except requests.exceptions.HTTPError as e:
             print(f"HTTP Error: {e}")
             try:
@@ -119,15 +531,180 @@ class SupabaseQueryBuilder:
                 pass
             raise e
 
+    def _query_params(self):
+        return list(self.params.items()) + self.filters
+
+    def _parse(self, response):
+        # Helper for empty responses (e.g., 204 No Content, 304 Not Modified)
+        if response.status_code in (204, 304):
+             return []
+
+        try:
+            return response.json()
+        except ValueError:
+            return []
+
+    def _send(self, json_data=None):
+        return self._parse(self._request(json_data))
+
+    def _chunks(self):
+        rows = self.json_data
+        size = self.chunk_size or len(rows) or 1
+        for start in range(0, len(rows), size):
+            yield start, rows[start:start + size]
+
+    def _is_bulk(self):
+        return self.method == 'POST' and isinstance(self.json_data, list) and self.chunk_size is not None
+
+    def execute(self):
+        if self._is_bulk():
+            data = []
+            for _, chunk in self._chunks():
+                data.extend(self._send(chunk))
+            return type('Response', (), {'data': data, 'count': len(data)})
+
+        response = self._request(self.json_data if self.method in ('POST', 'PATCH') else None)
+        data = self._parse(response)
+
+        return type('Response', (), {
+            'data': data,
+            'count': len(data) if isinstance(data, list) else 0,
+            'total': _parse_content_range(response.headers.get('Content-Range')),
+            'etag': response.headers.get('ETag'),
+            'not_modified': response.status_code == 304
+        })
+
+    def iter_pages(self, page_size=DEFAULT_PAGE_SIZE, keyset=None):
+        """Yield the result set one page (list of rows) at a time.
+
+        With keyset=('attendance_date', 'id') pages are fetched in ascending
+        key order using "after the last row" filters, which stays fast on deep
+        pages; otherwise limit/offset is used with the query's own ordering.
+        After the first page, self.total holds the exact row count if count()
+        was requested and self.etag the first page's ETag; a 304 on the first
+        page (see if_none_match) yields nothing and sets self.not_modified.
+        """
+        if self.method != 'GET' and not self.is_rpc:
+            raise ValueError("iter_pages() only supports select queries and rpc calls")
+
+        base_params = dict(self.params)
+        if keyset:
+            base_params['order'] = ','.join(f"{column}.asc" for column in keyset)
+        self.total = None
+        self.etag = None
+        self.not_modified = False
+        offset = 0
+        last_row = None
+
+        while True:
+            self.params = dict(base_params)
+            self.params['limit'] = str(page_size)
+            if keyset:
+                if last_row is not None:
+                    self.params['or'] = _keyset_filter(keyset, last_row)
+            else:
+                self.params['offset'] = str(offset)
+
+            # Set-returning functions page the same way; their params go in the body
+            response = self._request(self.json_data if self.is_rpc else None)
+            page = self._parse(response)
+            if offset == 0 and last_row is None:
+                self.total = _parse_content_range(response.headers.get('Content-Range'))
+                self.etag = response.headers.get('ETag')
+                if response.status_code == 304:
+                    self.not_modified = True
+                    break
+                # Only the first page needs the (potentially expensive) count or revalidation
+                self.headers.pop('If-None-Match', None)
+                self.headers['Prefer'] = ','.join(
+                    p for p in self.headers.get('Prefer', '').split(',') if p and not p.startswith('count=')
+                )
+
+            if page:
+                yield page
+            if len(page) < page_size:
+                break
+            offset += len(page)
+            last_row = page[-1]
+
+        self.params = base_params
+
+    def stream(self, page_size=DEFAULT_PAGE_SIZE, keyset=None):
+        # Row-by-row generator over iter_pages(); memory is bounded by one page
+        for page in self.iter_pages(page_size=page_size, keyset=keyset):
+            for row in page:
+                yield row
+
+    def stream_in(self, column, values, chunk_size=DEFAULT_IN_CHUNK_SIZE, page_size=DEFAULT_PAGE_SIZE, keyset=None):
+        """Stream rows whose `column` is one of `values`, one in.() filter per chunk.
+
+        Large id lists would overflow URL length limits as a single filter,
+        so they are split into chunks of `chunk_size` values; each chunk is
+        paged like stream(). Duplicate values are sent once.
+        """
+        values = list(dict.fromkeys(values))
+        for start in range(0, len(values), chunk_size):
+            self.in_(column, values[start:start + chunk_size])
+            try:
+                for row in self.stream(page_size=page_size, keyset=keyset):
+                    yield row
+            finally:
+                self.filters.pop()
+
+    def execute_bulk(self):
+        """Send a chunked insert/upsert, continuing past failed chunks.
+
+        Returns a response whose `failed` lists {'index', 'error'} for every
+        row of a chunk that was rejected, so callers can report per-row results.
+        """
+        if not self._is_bulk():
+            raise ValueError("execute_bulk() requires insert/upsert with a list payload")
+
+        data = []
+        failed = []
+        for start, chunk in self._chunks():
+            try:
+                data.extend(self._send(chunk))
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+                failed.extend({'index': start + offset, 'error': error} for offset in range(len(chunk)))
+
+        return type('Response', (), {'data': data, 'count': len(data), 'failed': failed})
+
+
+def _parse_content_range(value):
+    # "0-999/5000" -> 5000, "*/0" -> 0, missing or "*" total -> None
+    if not value or '/' not in value:
+        return None
+    total = value.rsplit('/', 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+def _quote_value(value):
+    value = str(value)
+    if any(ch in value for ch in ',()":'):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return value
+
+
+def _keyset_filter(keyset, last_row):
+    # Rows strictly after last_row in (k1, k2, ...) ascending order, as a PostgREST or=(...) filter
+    clauses = []
+    for i, column in enumerate(keyset):
+        parts = [f'{prev}.eq."{last_row[prev]}"' for prev in keyset[:i]]
+        parts.append(f'{column}.gt."{last_row[column]}"')
+        clauses.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return f"({','.join(clauses)})"
+
 
 def get_supabase_client():
     url = os.environ.get("SUPABASE_URL")
     key = os.environ.get("SUPABASE_KEY")
-    
+
     if not url or not key:
         # Fallback to defaults or raise error
         # Check if we are using the placeholders
         if not url or "your-project" in url:
              raise ValueError("Supabase URL and Key must be set in environment variables.")
-        
+
     return SupabaseClient(url, key)
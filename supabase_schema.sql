@@ -4,6 +4,9 @@
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Trigram indexes for student search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Admins table
 CREATE TABLE IF NOT EXISTS admins (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -42,13 +45,374 @@ CREATE TABLE IF NOT EXISTS attendance (
     UNIQUE(student_id, attendance_date)
 );
 
+-- Daily attendance rollup (date x batch x course), maintained by triggers below
+CREATE TABLE IF NOT EXISTS attendance_daily_rollup (
+    attendance_date DATE NOT NULL,
+    batch VARCHAR(100) NOT NULL,
+    course VARCHAR(100) NOT NULL,
+    present INTEGER NOT NULL DEFAULT 0,
+    absent INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (attendance_date, batch, course)
+);
+
+-- Offline sync batches already applied, keyed by the client's idempotency key
+CREATE TABLE IF NOT EXISTS attendance_sync_batches (
+    idempotency_key VARCHAR(100) PRIMARY KEY,
+    admin_id UUID REFERENCES admins(id),
+    attendance_date DATE NOT NULL,
+    record_count INTEGER NOT NULL DEFAULT 0,
+    result JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Student list order (KL University first) as a column, so /api/students can page it by keyset
+ALTER TABLE students ADD COLUMN IF NOT EXISTS batch_rank SMALLINT
+    GENERATED ALWAYS AS (CASE WHEN batch = 'KL University' THEN 0 ELSE 1 END) STORED;
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_students_batch ON students(batch);
 CREATE INDEX IF NOT EXISTS idx_students_course ON students(course);
 CREATE INDEX IF NOT EXISTS idx_students_status ON students(status);
+CREATE INDEX IF NOT EXISTS idx_students_list ON students(status, batch_rank, batch, roll_number);
+CREATE INDEX IF NOT EXISTS idx_students_roll_trgm ON students USING gin (roll_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_students_first_name_trgm ON students USING gin (first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_students_last_name_trgm ON students USING gin (last_name gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(attendance_date);
 CREATE INDEX IF NOT EXISTS idx_attendance_student ON attendance(student_id);
 CREATE INDEX IF NOT EXISTS idx_attendance_date_student ON attendance(attendance_date, student_id);
+CREATE INDEX IF NOT EXISTS idx_attendance_date_marked_at ON attendance(attendance_date, marked_at);
+
+-- Aggregation functions for reports (call via POST /rest/v1/rpc/<name>)
+-- Reports receive one row per group instead of one row per attendance record
+
+-- Per-date present/absent counts
+CREATE OR REPLACE FUNCTION attendance_counts_by_date(
+    p_start DATE,
+    p_end DATE,
+    p_batch TEXT DEFAULT NULL,
+    p_course TEXT DEFAULT NULL
+)
+RETURNS TABLE (attendance_date DATE, present BIGINT, absent BIGINT, total BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT a.attendance_date,
+           COUNT(*) FILTER (WHERE a.status = 'present'),
+           COUNT(*) FILTER (WHERE a.status = 'absent'),
+           COUNT(*)
+    FROM attendance a
+    JOIN students s ON s.id = a.student_id
+    WHERE a.attendance_date BETWEEN p_start AND p_end
+      AND (p_batch IS NULL OR s.batch = p_batch)
+      AND (p_course IS NULL OR s.course = p_course)
+    GROUP BY a.attendance_date
+    ORDER BY a.attendance_date;
+$$;
+
+-- Per-batch present/absent counts
+CREATE OR REPLACE FUNCTION attendance_counts_by_batch(
+    p_start DATE,
+    p_end DATE,
+    p_course TEXT DEFAULT NULL
+)
+RETURNS TABLE (batch VARCHAR, present BIGINT, absent BIGINT, total BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT s.batch,
+           COUNT(*) FILTER (WHERE a.status = 'present'),
+           COUNT(*) FILTER (WHERE a.status = 'absent'),
+           COUNT(*)
+    FROM attendance a
+    JOIN students s ON s.id = a.student_id
+    WHERE a.attendance_date BETWEEN p_start AND p_end
+      AND (p_course IS NULL OR s.course = p_course)
+    GROUP BY s.batch
+    ORDER BY s.batch;
+$$;
+
+-- Per-course present/absent counts
+CREATE OR REPLACE FUNCTION attendance_counts_by_course(
+    p_start DATE,
+    p_end DATE,
+    p_batch TEXT DEFAULT NULL
+)
+RETURNS TABLE (course VARCHAR, present BIGINT, absent BIGINT, total BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT s.course,
+           COUNT(*) FILTER (WHERE a.status = 'present'),
+           COUNT(*) FILTER (WHERE a.status = 'absent'),
+           COUNT(*)
+    FROM attendance a
+    JOIN students s ON s.id = a.student_id
+    WHERE a.attendance_date BETWEEN p_start AND p_end
+      AND (p_batch IS NULL OR s.batch = p_batch)
+    GROUP BY s.course
+    ORDER BY s.course;
+$$;
+
+-- Per-student present/absent counts
+CREATE OR REPLACE FUNCTION attendance_counts_by_student(
+    p_start DATE,
+    p_end DATE,
+    p_batch TEXT DEFAULT NULL,
+    p_course TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    student_id UUID,
+    roll_number VARCHAR,
+    first_name VARCHAR,
+    last_name VARCHAR,
+    batch VARCHAR,
+    course VARCHAR,
+    present BIGINT,
+    absent BIGINT,
+    total BIGINT
+)
+LANGUAGE sql STABLE AS $$
+    SELECT s.id, s.roll_number, s.first_name, s.last_name, s.batch, s.course,
+           COUNT(*) FILTER (WHERE a.status = 'present'),
+           COUNT(*) FILTER (WHERE a.status = 'absent'),
+           COUNT(*)
+    FROM attendance a
+    JOIN students s ON s.id = a.student_id
+    WHERE a.attendance_date BETWEEN p_start AND p_end
+      AND (p_batch IS NULL OR s.batch = p_batch)
+      AND (p_course IS NULL OR s.course = p_course)
+    GROUP BY s.id
+    ORDER BY s.batch, s.roll_number;
+$$;
+
+-- Present/absent counts for one student over an optional date range
+CREATE OR REPLACE FUNCTION student_attendance_summary(
+    p_student_id UUID,
+    p_start DATE DEFAULT NULL,
+    p_end DATE DEFAULT NULL
+)
+RETURNS TABLE (present BIGINT, absent BIGINT, total BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT COUNT(*) FILTER (WHERE a.status = 'present'),
+           COUNT(*) FILTER (WHERE a.status = 'absent'),
+           COUNT(*)
+    FROM attendance a
+    WHERE a.student_id = p_student_id
+      AND (p_start IS NULL OR a.attendance_date >= p_start)
+      AND (p_end IS NULL OR a.attendance_date <= p_end);
+$$;
+
+-- Rolling-window counts for one student (e.g. last 7/30/90 days up to p_as_of)
+CREATE OR REPLACE FUNCTION student_attendance_windows(
+    p_student_id UUID,
+    p_as_of DATE,
+    p_days INT[] DEFAULT ARRAY[7, 30, 90]
+)
+RETURNS TABLE (days INT, present BIGINT, absent BIGINT, total BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT w.days,
+           COUNT(a.id) FILTER (WHERE a.status = 'present'),
+           COUNT(a.id) FILTER (WHERE a.status = 'absent'),
+           COUNT(a.id)
+    FROM unnest(p_days) AS w(days)
+    LEFT JOIN attendance a
+      ON a.student_id = p_student_id
+     AND a.attendance_date > p_as_of - w.days
+     AND a.attendance_date <= p_as_of
+    GROUP BY w.days
+    ORDER BY w.days;
+$$;
+
+-- ============= marked_at stamping =============
+
+-- marked_at is the database clock at write time, whatever the client sent, so the
+-- /api/attendance/by-date change cursor compares stamps from a single clock.
+-- clock_timestamp() (not NOW(), the transaction start) keeps a long upsert's rows
+-- close to their commit time.
+CREATE OR REPLACE FUNCTION attendance_marked_at_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.marked_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_attendance_marked_at ON attendance;
+CREATE TRIGGER trg_attendance_marked_at
+    BEFORE INSERT OR UPDATE ON attendance
+    FOR EACH ROW EXECUTE FUNCTION attendance_marked_at_trigger();
+
+-- ============= Daily rollup maintenance =============
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one attendance row from the rollup
+CREATE OR REPLACE FUNCTION attendance_rollup_apply(
+    p_date DATE,
+    p_student_id UUID,
+    p_status TEXT,
+    p_sign INTEGER
+)
+RETURNS VOID
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO attendance_daily_rollup AS r (attendance_date, batch, course, present, absent, total)
+    SELECT p_date, s.batch, s.course,
+           CASE WHEN p_status = 'present' THEN p_sign ELSE 0 END,
+           CASE WHEN p_status = 'absent' THEN p_sign ELSE 0 END,
+           p_sign
+    FROM students s
+    WHERE s.id = p_student_id
+    ON CONFLICT (attendance_date, batch, course) DO UPDATE SET
+        present = r.present + EXCLUDED.present,
+        absent = r.absent + EXCLUDED.absent,
+        total = r.total + EXCLUDED.total,
+        updated_at = NOW();
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION attendance_rollup_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM attendance_rollup_apply(OLD.attendance_date, OLD.student_id, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM attendance_rollup_apply(NEW.attendance_date, NEW.student_id, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_attendance_rollup ON attendance;
+CREATE TRIGGER trg_attendance_rollup
+    AFTER INSERT OR DELETE OR UPDATE OF student_id, attendance_date, status ON attendance
+    FOR EACH ROW EXECUTE FUNCTION attendance_rollup_trigger();
+
+-- Move a student's counts when their batch/course changes, and remove them
+-- before a delete (the cascaded attendance deletes can no longer see the student)
+CREATE OR REPLACE FUNCTION attendance_rollup_student_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.batch IS NOT DISTINCT FROM OLD.batch
+       AND NEW.course IS NOT DISTINCT FROM OLD.course THEN
+        RETURN NEW;
+    END IF;
+
+    UPDATE attendance_daily_rollup r SET
+        present = r.present - c.present,
+        absent = r.absent - c.absent,
+        total = r.total - c.total,
+        updated_at = NOW()
+    FROM (
+        SELECT attendance_date,
+               COUNT(*) FILTER (WHERE status = 'present') AS present,
+               COUNT(*) FILTER (WHERE status = 'absent') AS absent,
+               COUNT(*) AS total
+        FROM attendance
+        WHERE student_id = OLD.id
+        GROUP BY attendance_date
+    ) c
+    WHERE r.attendance_date = c.attendance_date AND r.batch = OLD.batch AND r.course = OLD.course;
+
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+
+    INSERT INTO attendance_daily_rollup AS r (attendance_date, batch, course, present, absent, total)
+    SELECT attendance_date, NEW.batch, NEW.course,
+           COUNT(*) FILTER (WHERE status = 'present'),
+           COUNT(*) FILTER (WHERE status = 'absent'),
+           COUNT(*)
+    FROM attendance
+    WHERE student_id = NEW.id
+    GROUP BY attendance_date
+    ON CONFLICT (attendance_date, batch, course) DO UPDATE SET
+        present = r.present + EXCLUDED.present,
+        absent = r.absent + EXCLUDED.absent,
+        total = r.total + EXCLUDED.total,
+        updated_at = NOW();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_attendance_rollup_student ON students;
+CREATE TRIGGER trg_attendance_rollup_student
+    BEFORE DELETE OR UPDATE OF batch, course ON students
+    FOR EACH ROW EXECUTE FUNCTION attendance_rollup_student_trigger();
+
+-- Backfill / repair: rebuild the rollup for a date range (all dates when NULL)
+CREATE OR REPLACE FUNCTION refresh_attendance_daily_rollup(
+    p_start DATE DEFAULT NULL,
+    p_end DATE DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    rebuilt INTEGER;
+BEGIN
+    DELETE FROM attendance_daily_rollup
+    WHERE (p_start IS NULL OR attendance_date >= p_start)
+      AND (p_end IS NULL OR attendance_date <= p_end);
+
+    INSERT INTO attendance_daily_rollup (attendance_date, batch, course, present, absent, total)
+    SELECT a.attendance_date, s.batch, s.course,
+           COUNT(*) FILTER (WHERE a.status = 'present'),
+           COUNT(*) FILTER (WHERE a.status = 'absent'),
+           COUNT(*)
+    FROM attendance a
+    JOIN students s ON s.id = a.student_id
+    WHERE (p_start IS NULL OR a.attendance_date >= p_start)
+      AND (p_end IS NULL OR a.attendance_date <= p_end)
+    GROUP BY a.attendance_date, s.batch, s.course;
+
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$;
+
+-- Per-date counts read from the rollup (cost grows with days, not students x days)
+CREATE OR REPLACE FUNCTION attendance_rollup_by_date(
+    p_start DATE,
+    p_end DATE,
+    p_batch TEXT DEFAULT NULL,
+    p_course TEXT DEFAULT NULL
+)
+RETURNS TABLE (attendance_date DATE, present BIGINT, absent BIGINT, total BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT r.attendance_date, SUM(r.present)::BIGINT, SUM(r.absent)::BIGINT, SUM(r.total)::BIGINT
+    FROM attendance_daily_rollup r
+    WHERE r.attendance_date BETWEEN p_start AND p_end
+      AND (p_batch IS NULL OR r.batch = p_batch)
+      AND (p_course IS NULL OR r.course = p_course)
+    GROUP BY r.attendance_date
+    HAVING SUM(r.total) > 0
+    ORDER BY r.attendance_date;
+$$;
+
+-- One row per active student with the window's statuses packed into a string,
+-- one character per day: '0' not marked, '1' present, '2' absent
+CREATE OR REPLACE FUNCTION attendance_status_strings(
+    p_start DATE,
+    p_end DATE,
+    p_batch TEXT DEFAULT NULL,
+    p_course TEXT DEFAULT NULL
+)
+RETURNS TABLE (student_id UUID, statuses TEXT)
+LANGUAGE sql STABLE AS $$
+    SELECT s.id,
+           string_agg(
+               CASE a.status WHEN 'present' THEN '1' WHEN 'absent' THEN '2' ELSE '0' END,
+               '' ORDER BY d.day
+           )
+    FROM students s
+    CROSS JOIN generate_series(p_start, p_end, INTERVAL '1 day') AS d(day)
+    LEFT JOIN attendance a
+      ON a.student_id = s.id
+     AND a.attendance_date = d.day::date
+    WHERE s.status = 'active'
+      AND (p_batch IS NULL OR s.batch = p_batch)
+      AND (p_course IS NULL OR s.course = p_course)
+    GROUP BY s.id
+    ORDER BY s.id;
+$$;
 
 -- Insert default admin (password: admin123)
 -- Password hash generated with werkzeug.security.generate_password_hash('admin123')
@@ -122,9 +486,13 @@ ON CONFLICT (roll_number) DO NOTHING;
 ALTER TABLE admins ENABLE ROW LEVEL SECURITY;
 ALTER TABLE students ENABLE ROW LEVEL SECURITY;
 ALTER TABLE attendance ENABLE ROW LEVEL SECURITY;
+ALTER TABLE attendance_daily_rollup ENABLE ROW LEVEL SECURITY;
+ALTER TABLE attendance_sync_batches ENABLE ROW LEVEL SECURITY;
 
 -- Create policies for authenticated access
 -- Note: In production, adjust these policies based on your auth setup
 CREATE POLICY "Enable all access for authenticated users" ON admins FOR ALL USING (true);
 CREATE POLICY "Enable all access for authenticated users" ON students FOR ALL USING (true);
 CREATE POLICY "Enable all access for authenticated users" ON attendance FOR ALL USING (true);
+CREATE POLICY "Enable all access for authenticated users" ON attendance_daily_rollup FOR ALL USING (true);
+CREATE POLICY "Enable all access for authenticated users" ON attendance_sync_batches FOR ALL USING (true);
@@ -0,0 +1,72 @@
+"""
+Attendance marking against the fake PostgREST server from benchmarks/
+Usage: python -m pytest tests (or python -m unittest discover tests)
+"""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import fake_postgrest
+
+db = fake_postgrest.seed(fake_postgrest.FakeDatabase(), students=20, days=2)
+server = fake_postgrest.serve(db)
+os.environ.update(
+    SUPABASE_URL=f'http://127.0.0.1:{server.server_port}',
+    SUPABASE_KEY='test-key',
+    SECRET_KEY='test-secret-key-0123456789abcdef',
+    SESSION_BACKEND='memory',
+    CACHE_BACKEND='local'
+)
+
+import app
+
+
+class MarkAttendanceTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.app.test_client()
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+        self.assertEqual(response.status_code, 200)
+        self.students = [student['id'] for student in db.tables['students'][:2]]
+
+    def stored_status(self, student_id, day):
+        return [row['status'] for row in db.tables['attendance']
+                if row['student_id'] == student_id and str(row['attendance_date']) == day]
+
+    def test_repeated_student_last_record_wins(self):
+        first, second = self.students
+        response = self.client.post('/api/attendance/mark', json={
+            'attendance_date': '2026-01-05',
+            'attendance_records': [
+                {'student_id': first, 'status': 'present'},
+                {'student_id': second, 'status': 'present'},
+                {'student_id': first, 'status': 'absent'}
+            ]
+        })
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['failed'], [])
+        self.assertEqual(body['count'], 2)
+        self.assertEqual(self.stored_status(first, '2026-01-05'), ['absent'])
+        self.assertEqual(self.stored_status(second, '2026-01-05'), ['present'])
+
+    def test_invalid_records_are_reported(self):
+        response = self.client.post('/api/attendance/mark', json={
+            'attendance_date': '2026-01-06',
+            'attendance_records': [
+                {'student_id': self.students[0], 'status': 'late'},
+                {'status': 'present'},
+                {'student_id': self.students[1], 'status': 'absent'}
+            ]
+        })
+        body = response.get_json()
+        self.assertEqual(body['count'], 1)
+        self.assertEqual([item['error'] for item in body['failed']],
+                         ['Invalid status: late', 'Missing student_id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
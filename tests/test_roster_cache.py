@@ -0,0 +1,99 @@
+"""
+RosterCache: ETag revalidation and invalidation during a fetch
+Usage: python -m pytest tests (or python -m unittest discover tests)
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+from cache import RosterCache
+
+
+class FakeQuery:
+    """The slice of SupabaseQueryBuilder RosterCache uses; serves client.students in pages"""
+
+    def __init__(self, client):
+        self.client = client
+        self.sent_etag = None
+        self.etag = None
+        self.not_modified = False
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def order(self, column):
+        return self
+
+    def if_none_match(self, etag):
+        self.sent_etag = etag
+        return self
+
+    def iter_pages(self, page_size):
+        self.client.requests.append(self.sent_etag)
+        self.etag = self.client.etag
+        if self.sent_etag == self.client.etag:
+            self.not_modified = True
+            return
+        if self.client.during_fetch:
+            self.client.during_fetch()
+        for start in range(0, len(self.client.students), page_size):
+            yield self.client.students[start:start + page_size]
+
+
+class FakeClient:
+    def __init__(self, count):
+        self.students = [{'id': str(n), 'roll_number': f'R{n:04d}'} for n in range(count)]
+        self.etag = 'W/"1"'
+        self.requests = []
+        self.during_fetch = None
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+class RosterCacheTest(unittest.TestCase):
+    def expire(self, roster):
+        for _, entry in roster._cache.items():
+            entry.expires_at = 0
+
+    @mock.patch.object(cache, 'DEFAULT_PAGE_SIZE', 10)
+    def test_single_page_roster_is_revalidated(self):
+        client = FakeClient(5)
+        roster = RosterCache(client)
+        first = roster.get_students()
+        self.expire(roster)
+        self.assertIs(roster.get_students(), first)
+        self.assertEqual(client.requests, [None, 'W/"1"'])
+        self.assertEqual(roster.stats()['revalidated'], 1)
+
+    @mock.patch.object(cache, 'DEFAULT_PAGE_SIZE', 10)
+    def test_multi_page_roster_is_refetched(self):
+        # The first page's ETag says nothing about a change on the second
+        client = FakeClient(15)
+        roster = RosterCache(client)
+        roster.get_students()
+        self.expire(roster)
+        client.students[12]['roll_number'] = 'changed'
+        self.assertEqual(roster.get_students()[12]['roll_number'], 'changed')
+        self.assertEqual(client.requests, [None, None])
+
+    def test_fetch_overtaken_by_invalidation_is_not_cached(self):
+        client = FakeClient(3)
+        roster = RosterCache(client)
+        client.during_fetch = roster.invalidate
+        self.assertEqual(len(roster.get_students()), 3)
+        self.assertEqual(roster.stats()['entries'], 0)
+        client.during_fetch = None
+        roster.get_students()
+        self.assertEqual(roster.stats()['entries'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Cross-worker cache tier: version-stamp invalidation through RedisCacheStore
+Usage: python -m pytest tests (or python -m unittest discover tests)
+
+FakeRedis is an in-memory stand-in for the subset of redis-py the store
+uses, so these run without the redis package or a server.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shared_cache
+from shared_cache import RedisCacheStore
+
+
+class FakePipeline:
+    def __init__(self, server):
+        self.server = server
+        self.ops = None
+        self.watched = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def watch(self, key):
+        self.watched = (key, self.server.get(key))
+
+    def get(self, key):
+        return self.server.get(key)
+
+    def multi(self):
+        self.ops = []
+
+    def set(self, *args, **kwargs):
+        self.ops.append(('set', args, kwargs))
+
+    def hset(self, *args, **kwargs):
+        self.ops.append(('hset', args, kwargs))
+
+    def publish(self, *args, **kwargs):
+        self.ops.append(('publish', args, kwargs))
+
+    def execute(self):
+        with self.server.lock:
+            key, value = self.watched
+            if self.server.conflicts:
+                self.server.conflicts -= 1
+                raise shared_cache.WatchError(key)
+            if self.server.get(key) != value:
+                raise shared_cache.WatchError(key)
+            for name, args, kwargs in self.ops:
+                getattr(self.server, name)(*args, **kwargs)
+
+
+class FakePubSub:
+    def __init__(self, server):
+        self.server = server
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.server.subscribers.setdefault(channel, []).append(self.messages)
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+        self.subscribers = {}
+        self.lock = threading.RLock()
+        # Number of upcoming pipeline executes that fail as if a watched key changed
+        self.conflicts = 0
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, px=None):
+        self.values[key] = value if isinstance(value, bytes) else str(value).encode()
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({field: str(value).encode() for field, value in mapping.items()})
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    def publish(self, channel, message):
+        for messages in self.subscribers.get(channel, []):
+            messages.put({'type': 'message', 'data': message.encode()})
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+class RedisCacheStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeRedis()
+        self.store = RedisCacheStore(client=self.server)
+        self.other = RedisCacheStore(client=self.server)
+
+    def save(self, stamps):
+        return self.store.save('report', self.store.snapshot(), stamps, {'etag': 'x'}, b'payload', 60)
+
+    def test_load_returns_saved_entry(self):
+        self.assertTrue(self.save(['date:2026-10-18']))
+        self.assertEqual(self.store.load('report'), ({'etag': 'x'}, b'payload'))
+
+    def test_publish_from_another_origin_invalidates_entry(self):
+        self.assertTrue(self.save(['date:2026-10-18|KL University']))
+        with mock.patch('shared_cache.process_origin', return_value='other-host:1'):
+            self.assertEqual(self.other.publish(['date:2026-10-18|KL University'], {'cache': 'reports'}), 1)
+        self.assertIsNone(self.store.load('report'))
+
+    def test_publish_leaves_other_stamps_alone(self):
+        self.assertTrue(self.save(['date:2026-10-18|KL University']))
+        self.other.publish(['date:2026-10-17|KL University'], {'cache': 'reports'})
+        self.assertIsNotNone(self.store.load('report'))
+
+    def test_publish_retries_after_watch_conflict(self):
+        self.server.conflicts = 2
+        self.assertEqual(self.store.publish(['roster'], {'cache': 'roster'}), 1)
+        self.assertEqual(self.store.version(), 1)
+
+    def test_save_skips_result_overtaken_by_invalidation(self):
+        seq = self.store.snapshot()
+        self.other.publish(['roster'], {'cache': 'roster'})
+        self.assertFalse(self.store.save('roster', seq, ['roster'], {}, b'[]', 60))
+        self.assertIsNone(self.store.load('roster'))
+
+    def test_listener_starts_on_first_use_not_subscribe(self):
+        # subscribe() runs at import, which under gunicorn --preload is the master
+        self.store.subscribe(lambda event: None)
+        self.assertIsNone(self.store._listener)
+        self.assertEqual(self.server.subscribers, {})
+        self.store.load('report')
+        self.assertTrue(self.store._listener.is_alive())
+        self.assertEqual(len(self.server.subscribers[self.store.channel]), 1)
+
+    def test_after_fork_leaves_listener_to_first_use(self):
+        self.store.subscribe(lambda event: None)
+        self.store.load('report')
+        self.store._after_fork()
+        self.assertIsNone(self.store._listener)
+
+    def test_subscribers_only_hear_other_origins(self):
+        events = queue.Queue()
+        self.store.subscribe(events.put)
+        self.store.publish(['roster'], {'cache': 'roster', 'from': 'self'})
+        # As another worker would send it (its origin is host:pid of that process)
+        self.server.publish(self.store.channel, json.dumps(
+            {'origin': 'other-host:1', 'event': {'cache': 'roster', 'from': 'other'}}
+        ))
+        self.assertEqual(events.get(timeout=2), {'cache': 'roster', 'from': 'other'})
+        self.assertTrue(events.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+CSV student import: chunk splitting on row errors and partial reports
+Usage: python -m pytest tests (or python -m unittest discover tests)
+"""
+import io
+import json
+import os
+import sys
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_import import ImportReport, import_students
+
+HEADER = 'roll_number,first_name,last_name,batch,course\n'
+
+
+def http_error(status, code):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({'code': code, 'message': f'error {code}'}).encode()
+    return requests.exceptions.HTTPError(f'{status} error', response=response)
+
+
+class FakeStudents:
+    """Stands in for client.table('students'): rejects whole upserts like PostgREST does"""
+
+    def __init__(self, reject=None):
+        # roll_number -> (status, code) of the error a batch containing it gets
+        self.reject = reject or {}
+        self.stored = {}
+        self.calls = 0
+        self.records = None
+
+    def table(self, name):
+        return self
+
+    def upsert(self, records, on_conflict=None, chunk_size=None):
+        self.records = records
+        return self
+
+    def execute(self):
+        self.calls += 1
+        for record in self.records:
+            if record['roll_number'] in self.reject:
+                raise http_error(*self.reject[record['roll_number']])
+        self.stored.update((record['roll_number'], record) for record in self.records)
+        return type('Response', (), {'data': self.records})()
+
+
+def rows(*roll_numbers):
+    return ''.join(f'{roll},First,Last,KL University,Calibo Training\n' for roll in roll_numbers)
+
+
+class ImportStudentsTest(unittest.TestCase):
+    def test_constraint_violation_is_isolated_to_its_row(self):
+        client = FakeStudents(reject={'R3': (409, '23505')})
+        report = import_students(client, io.StringIO(HEADER + rows('R1', 'R2', 'R3', 'R4')))
+        self.assertEqual(report.imported, 3)
+        self.assertEqual([(error['line'], error['roll_number']) for error in report.errors], [(4, 'R3')])
+        self.assertEqual(sorted(client.stored), ['R1', 'R2', 'R4'])
+
+    def test_non_row_error_is_raised_without_splitting(self):
+        # A missing column (42703) fails every row the same way
+        client = FakeStudents(reject={'R1': (400, '42703')})
+        with self.assertRaises(requests.exceptions.HTTPError):
+            import_students(client, io.StringIO(HEADER + rows('R1', 'R2', 'R3', 'R4')))
+        self.assertEqual(client.calls, 1)
+
+    def test_report_keeps_chunks_written_before_an_error(self):
+        client = FakeStudents(reject={'R3': (401, 'PGRST301')})
+        report = ImportReport()
+        with self.assertRaises(requests.exceptions.HTTPError):
+            import_students(client, io.StringIO(HEADER + rows('R1', 'R2', 'R3')), chunk_size=2, report=report)
+        self.assertEqual(report.imported, 2)
+
+    def test_decode_error_partway_keeps_report(self):
+        # Past the text wrapper's first read, so earlier chunks are already written
+        data = (HEADER + rows(*(f'R{n}' for n in range(1000)))).encode() + b'\xff,Bad,Row,KL,Calibo\n'
+        report = ImportReport()
+        with self.assertRaises(UnicodeDecodeError):
+            import_students(FakeStudents(), io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'),
+                            chunk_size=100, report=report)
+        self.assertGreater(report.imported, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()